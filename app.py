@@ -10,7 +10,7 @@ from datetime import datetime
 import json
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
-from db.db_operations import DatabaseManager
+from db.db_operations import get_default_manager
 from chatbot.chatbot_routes import add_generate_new_route
 from feature_integration import create_feature_routes
 
@@ -31,7 +31,7 @@ os.makedirs(os.path.join(UPLOAD_FOLDER, "items"), exist_ok=True)
 os.makedirs(os.path.join(UPLOAD_FOLDER, "outfits"), exist_ok=True)
 
 # Initialize database manager
-db = DatabaseManager()
+db = get_default_manager()
 
 def allowed_file(filename):
     """Check if the file has an allowed extension."""
@@ -2,40 +2,185 @@
 """
 Database operations module for the Clothing Database System.
 This module provides CRUD operations for clothing items, outfits, and tags.
-Thread-safe version that creates new connections for each operation.
+Thread-safe version that keeps one connection per thread.
 """
 
 import os
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
 import shutil
 import threading
+from db.update_schema import migrate_calendar_dates
 
 # Define the database directory and file
 DB_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_FILE = os.path.expanduser("~/clothing_database.db")
 PHOTOS_DIR = os.path.join(DB_DIR, "photos")
 
+# Prepared statements kept per connection (sqlite3 defaults to 128). The cache is
+# keyed by SQL text, so modules keep fixed queries in module constants (_Q_*) to
+# send identical text on every call and have it prepared only once per connection
+STATEMENT_CACHE_SIZE = 512
+
+# Values bound per IN (...) list, well under SQLite's limit on bound parameters
+# (999 before SQLite 3.32)
+IN_BATCH_SIZE = 500
+
+# Connection settings applied each time a thread opens its connection;
+# the journal mode is stored in the database file and set once in _prepare_database
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+    # 64 MiB page cache (negative values are KiB)
+    "PRAGMA cache_size = -65536"
+)
+
+def _split_seasons(season):
+    """Split a comma-separated season value into season names."""
+    if not season:
+        return []
+    return [part.strip() for part in season.split(',') if part.strip()]
+
+# One row per season an item is worn in; also created by update_schema.py
+_ITEM_SEASONS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS item_seasons (
+        item_id INTEGER NOT NULL,
+        season TEXT NOT NULL COLLATE NOCASE,
+        PRIMARY KEY (season, item_id),
+        FOREIGN KEY (item_id) REFERENCES clothing_items (item_id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_item_seasons_item ON item_seasons (item_id)"
+)
+
+def _table_exists(conn, table):
+    """Check if a table exists in the database."""
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE"
+    return conn.execute(query, (table,)).fetchone() is not None
+
+def _ensure_item_seasons(conn):
+    """
+    Create and fill the item_seasons table if the database does not have it yet.
+    
+    Databases made by db_setup.py alone, or before item seasons were normalized,
+    lack the table that clothing item writes now maintain.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+    """
+    if _table_exists(conn, 'item_seasons'):
+        return
+    
+    # Another connection may get here at the same time; both steps are idempotent
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in _ITEM_SEASONS_SCHEMA:
+            conn.execute(statement)
+        if _table_exists(conn, 'clothing_items'):
+            rows = conn.execute("SELECT item_id, season FROM clothing_items WHERE season IS NOT NULL")
+            conn.executemany("INSERT OR IGNORE INTO item_seasons (item_id, season) VALUES (?, ?)",
+                             [(item_id, name) for item_id, season in rows.fetchall()
+                              for name in _split_seasons(season)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _ensure_calendar_dates(conn):
+    """
+    Migrate calendar_outfits to day ordinals if update_schema.py has not done so yet.
+    
+    The calendar module reads and writes ordinals, which a table still holding
+    YYYY-MM-DD text (schema version 0) cannot serve.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        
+    Raises:
+        ValueError: If a stored date cannot be parsed
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+        return
+    if _table_exists(conn, 'calendar_outfits'):
+        migrate_calendar_dates(conn)
+
+def _in_batches(values):
+    """
+    Split values into batches small enough to bind in one IN (...) list.
+    
+    Args:
+        values (list): Values to bind
+        
+    Yields:
+        tuple: (batch, placeholders) with the batch values and matching "?, ?, ..." text
+    """
+    for start in range(0, len(values), IN_BATCH_SIZE):
+        batch = values[start:start + IN_BATCH_SIZE]
+        yield batch, ', '.join('?' * len(batch))
+
+def _is_insert(query):
+    """Check if a query is an INSERT or REPLACE statement."""
+    return query.lstrip()[:7].upper().startswith(('INSERT', 'REPLACE'))
+
 class DatabaseManager:
     """Thread-safe class to manage database operations for the Clothing Database System."""
     
     def __init__(self):
         """Initialize the database manager."""
-        # No persistent connection in __init__ to ensure thread safety
-        pass
+        # Connections are opened lazily, one per thread, to ensure thread safety
+        self._local = threading.local()
+        # Set once the first connection has done the one-time database setup
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+    
+    def _prepare_database(self, conn):
+        """
+        Do the database setup that only needs to run once per manager.
+        
+        Args:
+            conn (sqlite3.Connection): Newly opened database connection
+        """
+        with self._prepare_lock:
+            if self._prepared:
+                return
+            # WAL lets readers run alongside a writer and needs fewer fsyncs
+            conn.execute("PRAGMA journal_mode = WAL")
+            _ensure_item_seasons(conn)
+            _ensure_calendar_dates(conn)
+            self._prepared = True
     
     def _get_connection(self):
         """
-        Get a new database connection.
+        Get the database connection for the current thread.
+        
+        The connection is kept open for the lifetime of the thread, so a
+        long-lived thread reuses SQLite's prepared statement cache between
+        queries. A thread that serves a single request, as under Flask's
+        threaded development server, still opens a connection of its own.
         
         Returns:
-            sqlite3.Connection: A new database connection
-        """
-        conn = sqlite3.connect(DB_FILE)
-        # Enable foreign key constraints
-        conn.execute("PRAGMA foreign_keys = ON")
-        # Configure SQLite to return rows as dictionaries
-        conn.row_factory = sqlite3.Row
+            sqlite3.Connection: The current thread's database connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Room for every fixed query the app sends, so none are re-prepared
+            conn = sqlite3.connect(DB_FILE, cached_statements=STATEMENT_CACHE_SIZE)
+            # Enable foreign key constraints and tune syncing and caching
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            if not self._prepared:
+                try:
+                    self._prepare_database(conn)
+                except Exception:
+                    conn.close()
+                    raise
+            # Configure SQLite to return rows as dictionaries
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
         return conn
     
     def execute_query(self, query, params=(), fetch_one=False, fetch_all=False):
@@ -51,21 +196,166 @@ class DatabaseManager:
         Returns:
             Various: Query results based on fetch parameters
         """
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            
+        with self._statement(query, params) as cursor:
             if fetch_one:
                 result = cursor.fetchone()
                 return dict(result) if result else None
             elif fetch_all:
                 return [dict(row) for row in cursor.fetchall()]
             else:
+                # lastrowid is per connection, so only report it for inserts
+                if cursor.lastrowid and _is_insert(query):
+                    return cursor.lastrowid
+                return cursor.rowcount
+    
+    def execute_insert(self, query, params=()):
+        """
+        Execute an INSERT query.
+        
+        Args:
+            query (str): SQL INSERT query to execute
+            params (tuple or list): Parameters for the query
+            
+        Returns:
+            int: Row ID of the inserted row
+        """
+        with self._statement(query, params) as cursor:
+            return cursor.lastrowid
+    
+    def execute_many(self, query, seq_of_params):
+        """
+        Execute a query once for each set of parameters.
+        
+        All executions share one prepared statement and are committed together.
+        
+        Args:
+            query (str): SQL query to execute
+            seq_of_params (iterable): Parameter tuples, one per execution
+            
+        Returns:
+            int: Total number of rows modified
+        """
+        with self._statement(query, seq_of_params, many=True) as cursor:
+            return cursor.rowcount
+    
+    def raw_execute(self, query, params=()):
+        """
+        Execute a query and return all of its rows as plain tuples.
+        
+        Skips the sqlite3.Row and dict conversion done by execute_query, for
+        internal queries whose columns are unpacked by position.
+        
+        Args:
+            query (str): SQL query to execute
+            params (tuple or list): Parameters for the query
+            
+        Returns:
+            list: Result rows as tuples, in the column order of the query
+        """
+        with self._statement(query, params) as cursor:
+            cursor.row_factory = None
+            return cursor.fetchall()
+    
+    @contextmanager
+    def _statement(self, query, params=(), many=False):
+        """
+        Execute a query and yield its cursor.
+        
+        Changes are committed when the block exits, unless a transaction()
+        block is active. On error any implicit transaction is rolled back.
+        
+        Args:
+            query (str): SQL query to execute
+            params (tuple or list): Parameters for the query
+            many (bool): Whether params is a sequence of parameter tuples
+            
+        Yields:
+            sqlite3.Cursor: Cursor holding the query results
+        """
+        conn = self._get_connection()
+        in_transaction = self._in_transaction()
+        cursor = conn.cursor()
+        try:
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
+            yield cursor
+            # Inside transaction() the commit happens when the block exits
+            if conn.in_transaction and not in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction and not in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            # Closing the cursor resets the cached statement for reuse
+            cursor.close()
+    
+    def _in_transaction(self):
+        """Check if the current thread is inside a transaction() block."""
+        return getattr(self._local, 'transaction_depth', 0) > 0
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Run a group of queries in a single transaction.
+        
+        Queries executed through this manager inside the block are committed
+        together when the block exits, or rolled back if it raises. Nested
+        blocks join the outer transaction.
+        
+        Yields:
+            sqlite3.Connection: The current thread's database connection
+        """
+        conn = self._get_connection()
+        depth = getattr(self._local, 'transaction_depth', 0)
+        
+        if depth == 0:
+            # Take the write lock up front so the group cannot be interleaved
+            conn.execute("BEGIN IMMEDIATE")
+        
+        self._local.transaction_depth = depth + 1
+        try:
+            yield conn
+        except Exception:
+            if depth == 0:
+                conn.rollback()
+            raise
+        else:
+            if depth == 0:
                 conn.commit()
-                return cursor.lastrowid if cursor.lastrowid else cursor.rowcount
         finally:
-            conn.close()
+            self._local.transaction_depth = depth
+    
+    def iter_rows(self, query, params=(), batch_size=256):
+        """
+        Execute a read query and yield its rows as plain tuples.
+        
+        Rows are fetched in batches so large result sets are never fully
+        loaded into memory.
+        
+        Args:
+            query (str): SQL query to execute
+            params (tuple or list): Parameters for the query
+            batch_size (int): Number of rows to fetch per batch
+        
+        Yields:
+            tuple: One result row, in the column order of the query
+        """
+        cursor = self._get_connection().cursor()
+        try:
+            # Plain tuples instead of sqlite3.Row for positional unpacking
+            cursor.row_factory = None
+            cursor.arraysize = batch_size
+            cursor.execute(query, params)
+            
+            rows = cursor.fetchmany()
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany()
+        finally:
+            cursor.close()
     
     # ---- Clothing Item Operations ----
     
@@ -100,7 +390,11 @@ class DatabaseManager:
         params = (name, item_type, color, brand, size, material, 
                   season, occasion, purchase_date, photo_path, notes)
         
-        return self.execute_query(query, params)
+        with self.transaction():
+            item_id = self.execute_query(query, params)
+            self._set_item_seasons(item_id, season)
+        
+        return item_id
     
     def get_clothing_item(self, item_id):
         """
@@ -115,6 +409,23 @@ class DatabaseManager:
         query = 'SELECT * FROM CLOTHING_ITEMS WHERE item_id = ?'
         return self.execute_query(query, (item_id,), fetch_one=True)
     
+    def get_clothing_items_by_ids(self, item_ids):
+        """
+        Get several clothing items by ID in one query per batch.
+        
+        Args:
+            item_ids (iterable): IDs of the clothing items
+            
+        Returns:
+            list: Clothing items as dictionaries, ordered by item_id
+        """
+        item_ids = sorted(set(item_ids))
+        items = []
+        for batch, placeholders in _in_batches(item_ids):
+            query = f'SELECT * FROM CLOTHING_ITEMS WHERE item_id IN ({placeholders}) ORDER BY item_id'
+            items.extend(self.execute_query(query, batch, fetch_all=True))
+        return items
+    
     def get_all_clothing_items(self, filters=None):
         """
         Get all clothing items, optionally filtered.
@@ -140,6 +451,33 @@ class DatabaseManager:
         
         return self.execute_query(query, params, fetch_all=True)
     
+    def get_clothing_items(self, season=None, occasion=None):
+        """
+        Get clothing items matching a season and/or occasion.
+        
+        Matching is a case-insensitive substring match, and All-Season items
+        match any season. Items with no season or occasion never match that filter.
+        
+        Args:
+            season (str, optional): Season to match (e.g., 'Summer')
+            occasion (str, optional): Occasion to match (e.g., 'Work')
+            
+        Returns:
+            list: List of matching clothing items as dictionaries
+        """
+        # Empty filters match everything, as None does
+        season = season or None
+        occasion = occasion or None
+        
+        query = '''
+        SELECT *
+        FROM CLOTHING_ITEMS
+        WHERE (? IS NULL OR season LIKE '%' || ? || '%' OR season LIKE '%all-season%')
+          AND (? IS NULL OR occasion LIKE '%' || ? || '%')
+        '''
+        
+        return self.execute_query(query, (season, season, occasion, occasion), fetch_all=True)
+    
     def update_clothing_item(self, item_id, **kwargs):
         """
         Update a clothing item.
@@ -165,9 +503,25 @@ class DatabaseManager:
         WHERE item_id = ?
         '''
         
-        result = self.execute_query(query, params)
+        with self.transaction():
+            result = self.execute_query(query, params)
+            if result > 0 and 'season' in kwargs:
+                self._set_item_seasons(item_id, kwargs['season'])
+        
         return result > 0
     
+    def _set_item_seasons(self, item_id, season):
+        """
+        Replace the item_seasons rows of a clothing item.
+        
+        Args:
+            item_id (int): ID of the clothing item
+            season (str): Comma-separated season value of the item
+        """
+        self.execute_query('DELETE FROM item_seasons WHERE item_id = ?', (item_id,))
+        self.execute_many('INSERT OR IGNORE INTO item_seasons (item_id, season) VALUES (?, ?)',
+                          [(item_id, name) for name in _split_seasons(season)])
+    
     def delete_clothing_item(self, item_id):
         """
         Delete a clothing item.
@@ -301,6 +655,56 @@ class DatabaseManager:
         
         return outfit
     
+    def attach_outfit_details(self, outfits):
+        """
+        Attach items and tags to a list of outfits.
+        
+        Uses one query for the items and one for the tags of each batch of
+        outfits, instead of two queries per outfit.
+        
+        Args:
+            outfits (list): List of outfit dictionaries with an 'outfit_id'
+            
+        Returns:
+            list: The same outfits with 'items' and 'tags' set
+        """
+        if not outfits:
+            return outfits
+        
+        outfit_ids = list({outfit['outfit_id'] for outfit in outfits})
+        items_by_outfit = {}
+        tags_by_outfit = {}
+        
+        for batch, placeholders in _in_batches(outfit_ids):
+            # Get the items of the outfits in this batch
+            query = f'''
+            SELECT oi.outfit_id as outfit_ref, ci.*
+            FROM CLOTHING_ITEMS ci
+            JOIN OUTFIT_ITEMS oi ON ci.item_id = oi.item_id
+            WHERE oi.outfit_id IN ({placeholders})
+            '''
+            
+            for item in self.execute_query(query, batch, fetch_all=True):
+                items_by_outfit.setdefault(item.pop('outfit_ref'), []).append(item)
+            
+            # Get the tags of the outfits in this batch
+            query = f'''
+            SELECT ot.outfit_id as outfit_ref, t.*, tc.name as category_name
+            FROM TAGS t
+            JOIN OUTFIT_TAGS ot ON t.tag_id = ot.tag_id
+            LEFT JOIN TAG_CATEGORIES tc ON t.category_id = tc.category_id
+            WHERE ot.outfit_id IN ({placeholders})
+            '''
+            
+            for tag in self.execute_query(query, batch, fetch_all=True):
+                tags_by_outfit.setdefault(tag.pop('outfit_ref'), []).append(tag)
+        
+        for outfit in outfits:
+            outfit['items'] = list(items_by_outfit.get(outfit['outfit_id'], []))
+            outfit['tags'] = list(tags_by_outfit.get(outfit['outfit_id'], []))
+        
+        return outfits
+    
     def get_all_outfits(self, filters=None):
         """
         Get all outfits, optionally filtered.
@@ -1210,3 +1614,24 @@ class DatabaseManager:
         '''
         
         return self.execute_query(query, fetch_all=True)
+
+# Shared manager for callers that do not supply their own
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+def get_default_manager():
+    """
+    Get the process-wide database manager.
+    
+    The manager keeps one connection per thread, so sharing it lets every
+    module on a thread reuse the same connection and its statement cache.
+    
+    Returns:
+        DatabaseManager: The shared database manager
+    """
+    global _default_manager
+    if _default_manager is None:
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = DatabaseManager()
+    return _default_manager
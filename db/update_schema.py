@@ -5,6 +5,114 @@ This script updates the database schema to support the additional features reque
 """
 
 import sqlite3
+from datetime import datetime
+
+# Calendar dates are stored as day ordinals (datetime.date.toordinal())
+CALENDAR_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        calendar_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        outfit_id INTEGER,
+        date INTEGER NOT NULL,
+        notes TEXT,
+        FOREIGN KEY (outfit_id) REFERENCES outfits (outfit_id) ON DELETE CASCADE
+    )
+    '''
+
+# Covering index for calendar lookups by date (calendar_id is the rowid)
+CALENDAR_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_calendar_date
+    ON calendar_outfits (date, outfit_id, notes)
+    '''
+
+def _has_column(cursor, table, column):
+    """Check if a table has a column."""
+    return any(row[1] == column for row in cursor.execute(f"PRAGMA table_info({table})"))
+
+def _calendar_day(date):
+    """
+    Convert a stored calendar date to a day ordinal.
+    
+    Args:
+        date: YYYY-MM-DD text, or a day ordinal already written by the current code
+        
+    Returns:
+        int: Day ordinal, or None if the date cannot be parsed
+    """
+    if isinstance(date, int):
+        return date
+    if isinstance(date, str) and date.isdigit():
+        return int(date)
+    try:
+        # strptime also accepts unpadded dates such as 2024-1-5, as the old validation did
+        return datetime.strptime(date, '%Y-%m-%d').date().toordinal()
+    except (TypeError, ValueError):
+        return None
+
+def migrate_calendar_dates(conn):
+    """
+    Rebuild calendar_outfits with integer day ordinals instead of YYYY-MM-DD text.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        
+    Raises:
+        ValueError: If a stored date cannot be parsed; the table is left unchanged
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another connection may have migrated the table since the caller checked
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= 1:
+            conn.rollback()
+            return
+        
+        rows = []
+        unparsed = []
+        entries = conn.execute('SELECT calendar_id, outfit_id, date, notes FROM calendar_outfits')
+        for calendar_id, outfit_id, date, notes in entries.fetchall():
+            day = _calendar_day(date)
+            if day is None:
+                unparsed.append((calendar_id, date))
+            else:
+                rows.append((calendar_id, outfit_id, day, notes))
+        if unparsed:
+            raise ValueError(f"Cannot migrate calendar_outfits, unparseable dates (calendar_id, date): {unparsed}")
+        
+        conn.execute(CALENDAR_TABLE_SQL.format(table='calendar_outfits_new'))
+        conn.executemany('''
+        INSERT INTO calendar_outfits_new (calendar_id, outfit_id, date, notes)
+        VALUES (?, ?, ?, ?)
+        ''', rows)
+        conn.execute('DROP TABLE calendar_outfits')
+        conn.execute('ALTER TABLE calendar_outfits_new RENAME TO calendar_outfits')
+        conn.execute(CALENDAR_INDEX_SQL)
+        # Schema version 1: calendar dates are day ordinals
+        conn.execute('PRAGMA user_version = 1')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _populate_item_seasons(conn):
+    """
+    Fill item_seasons from the comma-separated clothing_items.season values.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+    """
+    conn.execute('BEGIN')
+    conn.execute('''
+    WITH RECURSIVE split (item_id, season, rest) AS (
+        SELECT item_id, '', season || ',' FROM clothing_items WHERE season IS NOT NULL
+        UNION ALL
+        SELECT item_id, TRIM(substr(rest, 1, instr(rest, ',') - 1)), substr(rest, instr(rest, ',') + 1)
+        FROM split WHERE rest <> ''
+    )
+    INSERT OR IGNORE INTO item_seasons (item_id, season)
+    SELECT item_id, season FROM split WHERE season <> ''
+    ''')
+    # Schema version 2: item seasons are normalized into item_seasons
+    conn.execute('PRAGMA user_version = 2')
+    conn.commit()
 
 def update_schema():
     """Update the database schema to support additional features."""
@@ -12,20 +120,19 @@ def update_schema():
     cursor = conn.cursor()
     
     # Add status field to clothing_items table for laundry tracking
-    cursor.execute('''
-    ALTER TABLE clothing_items ADD COLUMN status TEXT DEFAULT 'clean'
-    ''')
+    if not _has_column(cursor, 'clothing_items', 'status'):
+        cursor.execute('''
+        ALTER TABLE clothing_items ADD COLUMN status TEXT DEFAULT 'clean'
+        ''')
     
     # Create calendar_outfits table for outfit calendar
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS calendar_outfits (
-        calendar_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        outfit_id INTEGER,
-        date TEXT NOT NULL,
-        notes TEXT,
-        FOREIGN KEY (outfit_id) REFERENCES outfits (outfit_id) ON DELETE CASCADE
-    )
-    ''')
+    cursor.execute(CALENDAR_TABLE_SQL.format(table='calendar_outfits'))
+    
+    # Migrate databases created before the current schema version (PRAGMA user_version)
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if version < 1:
+        migrate_calendar_dates(conn)
+    cursor.execute(CALENDAR_INDEX_SQL)
     
     # Create outfit_stats table for tracking outfit usage
     cursor.execute('''
@@ -51,6 +158,41 @@ def update_schema():
     )
     ''')
     
+    # Indexes for wear history lookups and per-outfit/per-item aggregates
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_outfit_stats_outfit
+    ON outfit_stats (outfit_id, wear_date DESC)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_outfit_stats_rating
+    ON outfit_stats (outfit_id, rating) WHERE rating IS NOT NULL
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_item_stats_item
+    ON item_stats (item_id, wear_date DESC)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_item_stats_outfit
+    ON item_stats (outfit_id)
+    ''')
+    
+    # Create item_seasons table with one row per season an item is worn in
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS item_seasons (
+        item_id INTEGER NOT NULL,
+        season TEXT NOT NULL COLLATE NOCASE,
+        PRIMARY KEY (season, item_id),
+        FOREIGN KEY (item_id) REFERENCES clothing_items (item_id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_item_seasons_item
+    ON item_seasons (item_id)
+    ''')
+    
+    if version < 2:
+        _populate_item_seasons(conn)
+    
     # Create seasonal_transitions table for seasonal wardrobe transitions
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS seasonal_transitions (
@@ -62,6 +204,12 @@ def update_schema():
     )
     ''')
     
+    # Index for transition lookups and clean-up by start date
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transitions_start
+    ON seasonal_transitions (start_date)
+    ''')
+    
     # Add color_season field to user_preferences table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS user_preferences (
@@ -79,6 +227,10 @@ def update_schema():
     ''')
     
     conn.commit()
+    
+    # Gather statistics so the query planner can make use of the indexes
+    cursor.execute('ANALYZE')
+    
     conn.close()
     
     print("Database schema updated successfully for additional features.")
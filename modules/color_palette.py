@@ -4,8 +4,19 @@ Color Palette Analysis module for the Clothing Database System.
 This module provides functionality to analyze color palettes and personal color seasons.
 """
 
+import bisect
 import json
-from db.db_operations import DatabaseManager
+from db.db_operations import get_default_manager
+
+# Harmony score cutoffs and the level/message for each band between them
+_HARMONY_CUTOFFS = (40, 60, 80)
+_HARMONY_LABELS = ('Poor', 'Fair', 'Good', 'Excellent')
+_HARMONY_MESSAGES = (
+    "This outfit may not have the best color harmony for your {season} color palette.",
+    "This outfit has fair color harmony for your {season} color palette.",
+    "This outfit has good color harmony for your {season} color palette.",
+    "This outfit has excellent color harmony for your {season} color palette!"
+)
 
 class ColorPaletteAnalyzer:
     """Class to analyze color palettes and personal color seasons."""
@@ -40,7 +51,9 @@ class ColorPaletteAnalyzer:
     
     def __init__(self, db_manager=None):
         """Initialize the color palette analyzer with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
+        # Harmony messages formatted per color season
+        self._harmony_messages = {}
     
     def get_user_color_season(self):
         """
@@ -78,24 +91,14 @@ class ColorPaletteAnalyzer:
                 print(f"Error: Invalid color season. Must be one of: {', '.join(self.COLOR_SEASONS.keys())}")
                 return False
             
+            # Insert the preference row, or update its season if it already exists
             query = """
-                UPDATE user_preferences
-                SET color_season = ?
-                WHERE pref_id = (SELECT pref_id FROM user_preferences LIMIT 1)
+                INSERT INTO user_preferences (pref_id, color_season, notification_preferences)
+                VALUES (1, ?, '{"outfit_calendar": true, "seasonal_transition": true}')
+                ON CONFLICT(pref_id) DO UPDATE SET color_season = excluded.color_season
             """
             self.db.execute_query(query, (season,))
             
-            # If no rows were updated, insert a new preference
-            query = "SELECT COUNT(*) as count FROM user_preferences"
-            result = self.db.execute_query(query, fetch_one=True)
-            
-            if result['count'] == 0:
-                query = """
-                    INSERT INTO user_preferences (color_season, notification_preferences)
-                    VALUES (?, '{"outfit_calendar": true, "seasonal_transition": true}')
-                """
-                self.db.execute_query(query, (season,))
-            
             return True
         except Exception as e:
             print(f"Error setting user color season: {e}")
@@ -229,18 +232,10 @@ class ColorPaletteAnalyzer:
             else:
                 harmony_score = (excellent_count * 100 + neutral_count * 50) / total_items
                 
-                if harmony_score >= 80:
-                    harmony_level = 'Excellent'
-                    message = f"This outfit has excellent color harmony for your {season} color palette!"
-                elif harmony_score >= 60:
-                    harmony_level = 'Good'
-                    message = f"This outfit has good color harmony for your {season} color palette."
-                elif harmony_score >= 40:
-                    harmony_level = 'Fair'
-                    message = f"This outfit has fair color harmony for your {season} color palette."
-                else:
-                    harmony_level = 'Poor'
-                    message = f"This outfit may not have the best color harmony for your {season} color palette."
+                # Look up the harmony band for the score
+                idx = bisect.bisect_right(_HARMONY_CUTOFFS, harmony_score)
+                harmony_level = _HARMONY_LABELS[idx]
+                message = self._harmony_message(season, idx)
             
             return {
                 'outfit_id': outfit_id,
@@ -259,6 +254,23 @@ class ColorPaletteAnalyzer:
             print(f"Error analyzing outfit color harmony: {e}")
             return None
     
+    def _harmony_message(self, season, level_index):
+        """
+        Get the harmony message for a color season and harmony level.
+        
+        Args:
+            season (str): Color season
+            level_index (int): Index into the harmony levels
+            
+        Returns:
+            str: Harmony message
+        """
+        messages = self._harmony_messages.get(season)
+        if messages is None:
+            messages = tuple(template.format(season=season) for template in _HARMONY_MESSAGES)
+            self._harmony_messages[season] = messages
+        return messages[level_index]
+    
     def get_wardrobe_color_analysis(self):
         """
         Analyze the color distribution of the entire wardrobe.
@@ -267,10 +279,6 @@ class ColorPaletteAnalyzer:
             dict: Wardrobe color analysis
         """
         try:
-            # Get all clothing items
-            query = "SELECT * FROM clothing_items"
-            items = self.db.execute_query(query, fetch_all=True)
-            
             # Get the user's color season
             season = self.get_user_color_season()
             season_info = self.get_color_season_info(season)
@@ -282,10 +290,15 @@ class ColorPaletteAnalyzer:
             
             # Count colors
             color_counts = {}
+            total_items = 0
             
-            for item in items:
+            # Only the color column is needed for the analysis
+            query = "SELECT color FROM clothing_items"
+            for (color,) in self.db.iter_rows(query):
+                total_items += 1
+                
                 # Analyze color compatibility
-                item_color = item['color'].lower() if item['color'] else ''
+                item_color = color.lower() if color else ''
                 
                 # Update color counts
                 if item_color:
@@ -309,7 +322,6 @@ class ColorPaletteAnalyzer:
                     neutral_count += 1
             
             # Calculate percentages
-            total_items = len(items)
             if total_items == 0:
                 excellent_percent = 0
                 neutral_percent = 0
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Date helpers for the Clothing Database System.
+This module provides the YYYY-MM-DD date parsing shared by the statistics and calendar modules.
+"""
+
+import datetime
+import re
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def parse_date(date):
+    """
+    Parse a date in YYYY-MM-DD format.
+    
+    Args:
+        date (str): Date string to parse
+        
+    Returns:
+        datetime.date: The parsed date
+    
+    Raises:
+        ValueError: If the date is not a valid YYYY-MM-DD date
+    """
+    # The regex rejects other ISO forms that fromisoformat would accept
+    if not isinstance(date, str) or not _ISO_DATE.fullmatch(date):
+        raise ValueError(f"Invalid date: {date!r}")
+    return datetime.date.fromisoformat(date)
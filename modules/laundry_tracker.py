@@ -4,14 +4,14 @@ Laundry Tracker module for the Clothing Database System.
 This module provides functionality to track the laundry status of clothing items.
 """
 
-from db.db_operations import DatabaseManager
+from db.db_operations import get_default_manager
 
 class LaundryTracker:
     """Class to manage the laundry status of clothing items."""
     
     def __init__(self, db_manager=None):
         """Initialize the laundry tracker with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
     
     def mark_as_dirty(self, item_id):
         """
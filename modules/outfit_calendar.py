@@ -5,14 +5,50 @@ This module provides functionality to plan outfits for specific dates.
 """
 
 import datetime
-from db.db_operations import DatabaseManager
+from db.db_operations import get_default_manager
+from modules.date_utils import parse_date
+from modules.result_cache import ResultCache
+
+# Dates are stored as day ordinals (datetime.date.toordinal()) and exposed
+# to callers as YYYY-MM-DD strings.
+_Q_INSERT_CAL = """
+    INSERT INTO calendar_outfits (outfit_id, date, notes)
+    VALUES (?, ?, ?)
+"""
+# Entry queries list their columns so rows can be unpacked positionally
+_Q_GET_BY_DATE = """
+    SELECT c.calendar_id, c.date, c.notes,
+           o.outfit_id, o.name, o.description, o.created_date,
+           o.modified_date, o.photo_path, o.rating
+    FROM calendar_outfits c
+    JOIN outfits o ON c.outfit_id = o.outfit_id
+    WHERE c.date = ?
+    LIMIT 1
+"""
+_Q_GET_RANGE = """
+    SELECT c.calendar_id, c.date, c.notes,
+           o.outfit_id, o.name, o.description, o.created_date,
+           o.modified_date, o.photo_path, o.rating
+    FROM calendar_outfits c
+    JOIN outfits o ON c.outfit_id = o.outfit_id
+    WHERE c.date >= ? AND c.date < ?
+    ORDER BY c.date, c.calendar_id
+"""
+_Q_GET_CAL = "SELECT * FROM calendar_outfits WHERE calendar_id = ?"
+_Q_DELETE_CAL = "DELETE FROM calendar_outfits WHERE calendar_id = ?"
 
 class OutfitCalendar:
     """Class to manage the outfit calendar."""
     
+    # Seconds a cached lookup is reused; writes through this calendar clear it at once
+    CACHE_TTL = 60
+    CACHE_MAX_ENTRIES = 64
+    
     def __init__(self, db_manager=None):
         """Initialize the outfit calendar with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
+        # Lookup results keyed by (kind, date string, ...)
+        self._cache = ResultCache(self.CACHE_TTL, self.CACHE_MAX_ENTRIES)
     
     def schedule_outfit(self, outfit_id, date, notes=None):
         """
@@ -28,25 +64,20 @@ class OutfitCalendar:
         """
         try:
             # Validate the date format
-            datetime.datetime.strptime(date, '%Y-%m-%d')
-            
-            # Check if the outfit exists
-            outfit = self.db.get_outfit(outfit_id)
-            if not outfit:
-                print(f"Error: Outfit with ID {outfit_id} does not exist")
-                return None
+            day = parse_date(date).toordinal()
             
-            # Insert the calendar entry
-            query = """
-                INSERT INTO calendar_outfits (outfit_id, date, notes)
-                VALUES (?, ?, ?)
-            """
-            self.db.execute_query(query, (outfit_id, date, notes))
+            with self.db.transaction():
+                # Check if the outfit exists
+                outfit = self.db.get_outfit(outfit_id)
+                if not outfit:
+                    print(f"Error: Outfit with ID {outfit_id} does not exist")
+                    return None
+                
+                # Insert the calendar entry
+                calendar_id = self.db.execute_insert(_Q_INSERT_CAL, (outfit_id, day, notes))
             
-            # Get the ID of the inserted entry
-            query = "SELECT last_insert_rowid() as calendar_id"
-            result = self.db.execute_query(query, fetch_one=True)
-            return result['calendar_id'] if result else None
+            self._cache.clear()
+            return calendar_id
         except ValueError:
             print(f"Error: Invalid date format. Please use YYYY-MM-DD")
             return None
@@ -66,30 +97,18 @@ class OutfitCalendar:
         """
         try:
             # Validate the date format
-            datetime.datetime.strptime(date, '%Y-%m-%d')
+            day = parse_date(date).toordinal()
             
-            # Get the calendar entry
-            query = """
-                SELECT c.calendar_id, c.outfit_id, c.date, c.notes, o.name as outfit_name
-                FROM calendar_outfits c
-                JOIN outfits o ON c.outfit_id = o.outfit_id
-                WHERE c.date = ?
-            """
-            calendar_entry = self.db.execute_query(query, (date,), fetch_one=True)
+            cached = self._cache.get(('date', date))
+            if cached:
+                return cached[1]
             
-            if not calendar_entry:
-                return None
+            # Get the calendar entry together with its outfit
+            entries = self._build_entries(self.db.iter_rows(_Q_GET_BY_DATE, (day,)))
             
-            # Get the outfit details
-            outfit = self.db.get_outfit(calendar_entry['outfit_id'])
-            
-            # Combine the data
-            return {
-                'calendar_id': calendar_entry['calendar_id'],
-                'date': calendar_entry['date'],
-                'notes': calendar_entry['notes'],
-                'outfit': outfit
-            }
+            entry = entries[0] if entries else None
+            self._cache.set(('date', date), entry)
+            return entry
         except ValueError:
             print(f"Error: Invalid date format. Please use YYYY-MM-DD")
             return None
@@ -107,43 +126,73 @@ class OutfitCalendar:
         Returns:
             list: List of scheduled outfits for the week
         """
+        return self.get_outfits_in_range(start_date, 7)
+    
+    def get_outfits_in_range(self, start_date, days):
+        """
+        Get all scheduled outfits for a number of days starting from a specific date.
+        
+        Args:
+            start_date (str): Starting date in YYYY-MM-DD format
+            days (int): Number of days to include, starting with start_date
+            
+        Returns:
+            list: List of scheduled outfits in the date range
+        """
         try:
             # Validate the date format
-            start = datetime.datetime.strptime(start_date, '%Y-%m-%d')
-            
-            # Calculate the end date (7 days later)
-            end = start + datetime.timedelta(days=7)
-            end_date = end.strftime('%Y-%m-%d')
+            start = parse_date(start_date).toordinal()
             
-            # Get the calendar entries
-            query = """
-                SELECT c.calendar_id, c.outfit_id, c.date, c.notes, o.name as outfit_name
-                FROM calendar_outfits c
-                JOIN outfits o ON c.outfit_id = o.outfit_id
-                WHERE c.date >= ? AND c.date < ?
-                ORDER BY c.date
-            """
-            calendar_entries = self.db.execute_query(query, (start_date, end_date), fetch_all=True)
+            cached = self._cache.get(('range', start_date, days))
+            if cached:
+                return cached[1]
             
-            # Get the outfit details for each entry
-            result = []
-            for entry in calendar_entries:
-                outfit = self.db.get_outfit(entry['outfit_id'])
-                result.append({
-                    'calendar_id': entry['calendar_id'],
-                    'date': entry['date'],
-                    'notes': entry['notes'],
-                    'outfit': outfit
-                })
+            # Get the calendar entries for the days from the start date
+            rows = self.db.iter_rows(_Q_GET_RANGE, (start, start + days))
             
-            return result
+            entries = self._build_entries(rows)
+            self._cache.set(('range', start_date, days), entries)
+            return entries
         except ValueError:
             print(f"Error: Invalid date format. Please use YYYY-MM-DD")
             return []
         except Exception as e:
-            print(f"Error getting outfits for week: {e}")
+            print(f"Error getting outfits for date range: {e}")
             return []
     
+    def _build_entries(self, rows):
+        """
+        Build calendar entries from joined calendar/outfit rows.
+        
+        Args:
+            rows (iterable): Row tuples in the column order of _Q_GET_RANGE
+            
+        Returns:
+            list: Calendar entries with the full outfit data
+        """
+        entries = []
+        for (calendar_id, day, notes, outfit_id, name, description,
+             created_date, modified_date, photo_path, rating) in rows:
+            entries.append({
+                'calendar_id': calendar_id,
+                'date': datetime.date.fromordinal(day).isoformat(),
+                'notes': notes,
+                'outfit': {
+                    'outfit_id': outfit_id,
+                    'name': name,
+                    'description': description,
+                    'created_date': created_date,
+                    'modified_date': modified_date,
+                    'photo_path': photo_path,
+                    'rating': rating
+                }
+            })
+        
+        # Load the items and tags of all outfits at once
+        self.db.attach_outfit_details([entry['outfit'] for entry in entries])
+        
+        return entries
+    
     def update_scheduled_outfit(self, calendar_id, outfit_id=None, date=None, notes=None):
         """
         Update a scheduled outfit.
@@ -158,24 +207,9 @@ class OutfitCalendar:
             bool: True if successful, False otherwise
         """
         try:
-            # Check if the calendar entry exists
-            query = "SELECT * FROM calendar_outfits WHERE calendar_id = ?"
-            entry = self.db.execute_query(query, (calendar_id,), fetch_one=True)
-            
-            if not entry:
-                print(f"Error: Calendar entry with ID {calendar_id} does not exist")
-                return False
-            
             # Validate the date format if provided
-            if date:
-                datetime.datetime.strptime(date, '%Y-%m-%d')
-            
-            # Check if the outfit exists if provided
-            if outfit_id:
-                outfit = self.db.get_outfit(outfit_id)
-                if not outfit:
-                    print(f"Error: Outfit with ID {outfit_id} does not exist")
-                    return False
+            if date is not None:
+                day = parse_date(date).toordinal()
             
             # Build the update query
             update_parts = []
@@ -187,21 +221,37 @@ class OutfitCalendar:
             
             if date is not None:
                 update_parts.append("date = ?")
-                params.append(date)
+                params.append(day)
             
             if notes is not None:
                 update_parts.append("notes = ?")
                 params.append(notes)
             
-            if not update_parts:
-                # Nothing to update
-                return True
-            
-            # Execute the update
-            query = f"UPDATE calendar_outfits SET {', '.join(update_parts)} WHERE calendar_id = ?"
-            params.append(calendar_id)
-            self.db.execute_query(query, tuple(params))
+            with self.db.transaction():
+                # Check if the calendar entry exists
+                entry = self.db.execute_query(_Q_GET_CAL, (calendar_id,), fetch_one=True)
+                
+                if not entry:
+                    print(f"Error: Calendar entry with ID {calendar_id} does not exist")
+                    return False
+                
+                # Check if the outfit exists if provided
+                if outfit_id:
+                    outfit = self.db.get_outfit(outfit_id)
+                    if not outfit:
+                        print(f"Error: Outfit with ID {outfit_id} does not exist")
+                        return False
+                
+                if not update_parts:
+                    # Nothing to update
+                    return True
+                
+                # Execute the update
+                query = f"UPDATE calendar_outfits SET {', '.join(update_parts)} WHERE calendar_id = ?"
+                params.append(calendar_id)
+                self.db.execute_query(query, tuple(params))
             
+            self._cache.clear()
             return True
         except ValueError:
             print(f"Error: Invalid date format. Please use YYYY-MM-DD")
@@ -222,17 +272,16 @@ class OutfitCalendar:
         """
         try:
             # Check if the calendar entry exists
-            query = "SELECT * FROM calendar_outfits WHERE calendar_id = ?"
-            entry = self.db.execute_query(query, (calendar_id,), fetch_one=True)
+            entry = self.db.execute_query(_Q_GET_CAL, (calendar_id,), fetch_one=True)
             
             if not entry:
                 print(f"Error: Calendar entry with ID {calendar_id} does not exist")
                 return False
             
             # Delete the entry
-            query = "DELETE FROM calendar_outfits WHERE calendar_id = ?"
-            self.db.execute_query(query, (calendar_id,))
+            self.db.execute_query(_Q_DELETE_CAL, (calendar_id,))
             
+            self._cache.clear()
             return True
         except Exception as e:
             print(f"Error deleting scheduled outfit: {e}")
@@ -259,7 +308,7 @@ class OutfitCalendar:
             list: List of scheduled outfits for the upcoming days
         """
         today = datetime.datetime.now().strftime('%Y-%m-%d')
-        return self.get_outfits_for_week(today)[:days]
+        return self.get_outfits_in_range(today, days)
 
 
 # Example usage
@@ -4,15 +4,180 @@ Outfit Generator for the Clothing Database System.
 This module provides logic for generating outfit suggestions based on clothing items.
 """
 
+import functools
 import random
-from db.db_operations import DatabaseManager
+import re
+from collections import defaultdict
+from db.db_operations import get_default_manager
+
+# Essential item types per style. Each entry is a tuple of item type groups,
+# where each group contains alternative types.
+_ESSENTIALS = {
+    # Default essential types (casual)
+    'default': (
+        ('Shirt', 'T-shirt', 'Blouse', 'Top'),  # Upper body
+        ('Pants', 'Jeans', 'Shorts', 'Skirt'),  # Lower body
+        ('Shoes', 'Sneakers', 'Sandals', 'Boots')  # Footwear
+    ),
+    'formal': (
+        ('Dress Shirt', 'Blouse', 'Shirt'),
+        ('Dress Pants', 'Skirt', 'Suit Pants'),
+        ('Dress Shoes', 'Heels'),
+        ('Jacket', 'Blazer', 'Suit Jacket')
+    ),
+    'business': (
+        ('Dress Shirt', 'Blouse', 'Shirt'),
+        ('Dress Pants', 'Skirt', 'Suit Pants'),
+        ('Dress Shoes', 'Heels', 'Loafers'),
+        ('Blazer', 'Jacket')
+    ),
+    'sporty': (
+        ('T-shirt', 'Tank Top', 'Sports Bra'),
+        ('Shorts', 'Leggings', 'Track Pants'),
+        ('Sneakers', 'Athletic Shoes'),
+    ),
+    'bohemian': (
+        ('Blouse', 'Tunic', 'Top'),
+        ('Maxi Skirt', 'Flowy Pants', 'Jeans'),
+        ('Sandals', 'Boots', 'Flats'),
+    ),
+    'vintage': (
+        ('Blouse', 'Shirt', 'Top'),
+        ('High-Waisted Pants', 'Skirt', 'Jeans'),
+        ('Loafers', 'Heels', 'Boots'),
+    ),
+    'minimalist': (
+        ('Shirt', 'T-shirt', 'Blouse'),
+        ('Pants', 'Skirt', 'Jeans'),
+        ('Sneakers', 'Flats', 'Boots'),
+    )
+}
+
+# Words looked for in a style, in priority order, with their _ESSENTIALS key
+_STYLE_MARKERS = (
+    ('formal', 'formal'),
+    ('business', 'business'),
+    ('casual', 'default'),
+    ('sporty', 'sporty'),
+    ('athletic', 'sporty'),
+    ('bohemian', 'bohemian'),
+    ('boho', 'bohemian'),
+    ('vintage', 'vintage'),
+    ('retro', 'vintage'),
+    ('minimalist', 'minimalist')
+)
+
+@functools.lru_cache(maxsize=32)
+def _style_key(style):
+    """
+    Get the _ESSENTIALS key for a style.
+    
+    Args:
+        style (str or None): Style preference
+        
+    Returns:
+        str: Key into _ESSENTIALS, 'default' if the style is not recognized
+    """
+    if style:
+        style = style.lower()
+        for marker, key in _STYLE_MARKERS:
+            if marker in style:
+                return key
+    
+    return 'default'
+
+@functools.lru_cache(maxsize=32)
+def _outfit_name(style, occasion, season):
+    """
+    Generate a name for an outfit from its style, occasion, and season.
+    
+    Args:
+        style (str or None): Style preference
+        occasion (str or None): Occasion for the outfit
+        season (str or None): Season for the outfit
+        
+    Returns:
+        str: Generated outfit name
+    """
+    if not (style or occasion or season):
+        return "Everyday Outfit"
+    
+    return (f"{style + ' ' if style else ''}"
+            f"{occasion + ' ' if occasion else ''}"
+            f"{season + ' ' if season else ''}Outfit")
+
+def _keyword_pattern(*keyword_tables):
+    """
+    Compile a regex matching any keyword from the given tables as a whole word.
+    
+    Args:
+        *keyword_tables (dict): Keywords mapped to their canonical values
+        
+    Returns:
+        re.Pattern: Pattern whose first group is the matched keyword
+    """
+    # A keyword may appear in several tables but only needs one alternative
+    keywords = dict.fromkeys(keyword for table in keyword_tables for keyword in table)
+    return re.compile(r"\b(" + "|".join(map(re.escape, keywords)) + r")\b")
 
 class OutfitGenerator:
     """Class to generate outfit suggestions based on clothing items in the database."""
     
+    # Keywords recognized in outfit requests, mapped to their canonical values
+    STYLE_KEYWORDS = {
+        "casual": "Casual",
+        "formal": "Formal",
+        "business": "Business",
+        "professional": "Business",
+        "bohemian": "Bohemian",
+        "boho": "Bohemian",
+        "minimalist": "Minimalist",
+        "vintage": "Vintage",
+        "retro": "Vintage",
+        "sporty": "Sporty",
+        "athletic": "Sporty"
+    }
+    
+    OCCASION_KEYWORDS = {
+        "work": "Work",
+        "office": "Work",
+        "date": "Date Night",
+        "party": "Party",
+        "weekend": "Weekend",
+        "casual": "Casual Outing",
+        "vacation": "Vacation",
+        "travel": "Travel",
+        "interview": "Interview",
+        "meeting": "Meeting",
+        "special": "Special Occasion",
+        "wedding": "Wedding",
+        "dinner": "Dinner"
+    }
+    
+    SEASON_KEYWORDS = {
+        "summer": "Summer",
+        "winter": "Winter",
+        "fall": "Fall",
+        "autumn": "Fall",
+        "spring": "Spring",
+        "hot": "Summer",
+        "cold": "Winter",
+        "warm": "Summer",
+        "cool": "Fall",
+        "rainy": "Spring"
+    }
+    
+    NO_ITEMS_MESSAGE = "No clothing items found in the database. Please add some items first."
+    
+    # Optional item types added on top of the essentials
+    ACCESSORY_TYPES = ('Accessory', 'Jewelry', 'Hat', 'Scarf', 'Belt')
+    
+    # Compiled once so each message is scanned in a single pass for all categories
+    _KEYWORD_RE = _keyword_pattern(STYLE_KEYWORDS, OCCASION_KEYWORDS, SEASON_KEYWORDS)
+    
     def __init__(self, db_manager=None):
         """Initialize the outfit generator with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
     
     def generate_outfit(self, style=None, occasion=None, season=None):
         """
@@ -26,37 +191,67 @@ class OutfitGenerator:
         Returns:
             dict: Generated outfit data including name, items, and metadata
         """
-        # Get all clothing items
-        items = self.db.get_all_clothing_items()
+        # Get matching clothing items, relaxing filters that match nothing
+        items = self._get_candidate_items(season, occasion)
         if not items:
             return {
                 'success': False,
-                'message': "No clothing items found in the database. Please add some items first."
+                'message': self.NO_ITEMS_MESSAGE
             }
         
-        # Filter items by season if specified
-        if season:
-            season_items = [item for item in items if item['season'] and 
-                           (season.lower() in item['season'].lower() or 
-                            "all-season" in item['season'].lower())]
-            if season_items:
-                items = season_items
-        
-        # Filter items by occasion if specified
-        if occasion:
-            occasion_items = [item for item in items if item['occasion'] and 
-                             occasion.lower() in item['occasion'].lower()]
-            if occasion_items:
-                items = occasion_items
-        
-        # Group items by type
-        items_by_type = {}
+        return self._build_outfit(self._group_by_type(items), style, occasion, season)
+    
+    def generate_outfits(self, n, style=None, occasion=None, season=None):
+        """
+        Generate several outfits with the same style, occasion, and season.
+        
+        The wardrobe is queried and grouped once for the whole batch, so this is
+        cheaper than calling generate_outfit() n times.
+        
+        Args:
+            n (int): Number of outfits to generate
+            style (str, optional): Style preference (e.g., 'Casual', 'Formal')
+            occasion (str, optional): Occasion for the outfit (e.g., 'Work', 'Date Night')
+            season (str, optional): Season for the outfit (e.g., 'Summer', 'Winter')
+            
+        Returns:
+            list: List of n results, each in the format returned by generate_outfit()
+        """
+        items = self._get_candidate_items(season, occasion)
+        if not items:
+            return [{'success': False, 'message': self.NO_ITEMS_MESSAGE} for _ in range(n)]
+        
+        items_by_type = self._group_by_type(items)
+        return [self._build_outfit(items_by_type, style, occasion, season) for _ in range(n)]
+    
+    def _group_by_type(self, items):
+        """
+        Group clothing items by their type.
+        
+        Args:
+            items (list): List of clothing items as dictionaries
+            
+        Returns:
+            defaultdict: Lists of items keyed by item type
+        """
+        items_by_type = defaultdict(list)
         for item in items:
-            item_type = item['type']
-            if item_type not in items_by_type:
-                items_by_type[item_type] = []
-            items_by_type[item_type].append(item)
+            items_by_type[item['type']].append(item)
+        return items_by_type
+    
+    def _build_outfit(self, items_by_type, style=None, occasion=None, season=None):
+        """
+        Build one random outfit from grouped clothing items.
         
+        Args:
+            items_by_type (dict): Lists of candidate items keyed by item type
+            style (str, optional): Style preference
+            occasion (str, optional): Occasion for the outfit
+            season (str, optional): Season for the outfit
+            
+        Returns:
+            dict: Generated outfit data including name, items, and metadata
+        """
         # Define essential item types based on style
         essential_types = self._get_essential_types(style)
         
@@ -68,9 +263,11 @@ class OutfitGenerator:
         for type_group in essential_types:
             added = False
             for item_type in type_group:
-                if item_type in items_by_type and items_by_type[item_type]:
+                # get() so missing types are not added to the defaultdict
+                type_items = items_by_type.get(item_type)
+                if type_items:
                     # Select an item of this type
-                    item = random.choice(items_by_type[item_type])
+                    item = random.choice(type_items)
                     outfit_items.append(item)
                     outfit_description.append(f"{item['name']} ({item['color']})")
                     added = True
@@ -80,13 +277,15 @@ class OutfitGenerator:
             if not added and type_group:
                 print(f"Warning: Could not find any items of types: {', '.join(type_group)}")
         
-        # Try to add accessories if available
-        accessory_types = ['Accessory', 'Jewelry', 'Hat', 'Scarf', 'Belt']
-        for acc_type in accessory_types:
-            if acc_type in items_by_type and items_by_type[acc_type] and random.random() < 0.7:  # 70% chance to add accessory
-                accessory = random.choice(items_by_type[acc_type])
-                outfit_items.append(accessory)
-                outfit_description.append(f"{accessory['name']} ({accessory['color']})")
+        # Try to add accessories if available, each type with a 70% chance.
+        # Drawing the count first and sampling that many types gives the same
+        # odds as one draw per type.
+        accessory_types = [acc_type for acc_type in self.ACCESSORY_TYPES if items_by_type.get(acc_type)]
+        count = sum(random.random() < 0.7 for _ in accessory_types)
+        for acc_type in random.sample(accessory_types, count):
+            accessory = random.choice(items_by_type[acc_type])
+            outfit_items.append(accessory)
+            outfit_description.append(f"{accessory['name']} ({accessory['color']})")
         
         # Generate outfit name
         outfit_name = self._generate_outfit_name(style, occasion, season)
@@ -136,6 +335,37 @@ class OutfitGenerator:
             'outfit': outfit_data
         }
     
+    def _get_candidate_items(self, season=None, occasion=None):
+        """
+        Get the clothing items to build an outfit from.
+        
+        The season filter is applied first and the occasion filter within it;
+        a filter that leaves no items is dropped, so there is always something
+        to choose from while the wardrobe is not empty.
+        
+        Args:
+            season (str, optional): Season for the outfit
+            occasion (str, optional): Occasion for the outfit
+            
+        Returns:
+            list: List of clothing items as dictionaries
+        """
+        # Treat empty filters as no filter
+        season = season or None
+        occasion = occasion or None
+        attempts = [(season, occasion)]
+        if season and occasion:
+            attempts.extend([(season, None), (None, occasion)])
+        if season or occasion:
+            attempts.append((None, None))
+        
+        for season_filter, occasion_filter in attempts:
+            items = self.db.get_clothing_items(season_filter, occasion_filter)
+            if items:
+                return items
+        
+        return []
+    
     def _get_essential_types(self, style=None):
         """
         Get essential item types based on style.
@@ -144,62 +374,9 @@ class OutfitGenerator:
             style (str, optional): Style preference
             
         Returns:
-            list: List of item type groups, where each group contains alternative types
+            tuple: Tuple of item type groups, where each group contains alternative types
         """
-        # Default essential types (casual)
-        essential_types = [
-            ['Shirt', 'T-shirt', 'Blouse', 'Top'],  # Upper body
-            ['Pants', 'Jeans', 'Shorts', 'Skirt'],  # Lower body
-            ['Shoes', 'Sneakers', 'Sandals', 'Boots']  # Footwear
-        ]
-        
-        # Adjust based on style
-        if style:
-            style = style.lower()
-            
-            if 'formal' in style:
-                essential_types = [
-                    ['Dress Shirt', 'Blouse', 'Shirt'],
-                    ['Dress Pants', 'Skirt', 'Suit Pants'],
-                    ['Dress Shoes', 'Heels'],
-                    ['Jacket', 'Blazer', 'Suit Jacket']
-                ]
-            elif 'business' in style:
-                essential_types = [
-                    ['Dress Shirt', 'Blouse', 'Shirt'],
-                    ['Dress Pants', 'Skirt', 'Suit Pants'],
-                    ['Dress Shoes', 'Heels', 'Loafers'],
-                    ['Blazer', 'Jacket']
-                ]
-            elif 'casual' in style:
-                # Already set as default
-                pass
-            elif 'sporty' in style or 'athletic' in style:
-                essential_types = [
-                    ['T-shirt', 'Tank Top', 'Sports Bra'],
-                    ['Shorts', 'Leggings', 'Track Pants'],
-                    ['Sneakers', 'Athletic Shoes'],
-                ]
-            elif 'bohemian' in style or 'boho' in style:
-                essential_types = [
-                    ['Blouse', 'Tunic', 'Top'],
-                    ['Maxi Skirt', 'Flowy Pants', 'Jeans'],
-                    ['Sandals', 'Boots', 'Flats'],
-                ]
-            elif 'vintage' in style or 'retro' in style:
-                essential_types = [
-                    ['Blouse', 'Shirt', 'Top'],
-                    ['High-Waisted Pants', 'Skirt', 'Jeans'],
-                    ['Loafers', 'Heels', 'Boots'],
-                ]
-            elif 'minimalist' in style:
-                essential_types = [
-                    ['Shirt', 'T-shirt', 'Blouse'],
-                    ['Pants', 'Skirt', 'Jeans'],
-                    ['Sneakers', 'Flats', 'Boots'],
-                ]
-        
-        return essential_types
+        return _ESSENTIALS[_style_key(style)]
     
     def _generate_outfit_name(self, style=None, occasion=None, season=None):
         """
@@ -213,23 +390,25 @@ class OutfitGenerator:
         Returns:
             str: Generated outfit name
         """
-        name_parts = []
-        
-        if style:
-            name_parts.append(style)
-        
-        if occasion:
-            name_parts.append(occasion)
-        
-        if season:
-            name_parts.append(season)
-        
-        if not name_parts:
-            name_parts.append("Everyday")
+        return _outfit_name(style, occasion, season)
+    
+    def _match_keyword(self, found, keywords):
+        """
+        Pick the highest priority keyword found in a message.
         
-        name_parts.append("Outfit")
+        Args:
+            found (set): Keywords found in the message
+            keywords (dict): Keywords mapped to canonical values, in priority order
+            
+        Returns:
+            str: Canonical value of the matched keyword, or None if none match
+        """
+        if not found:
+            return None
         
-        return " ".join(name_parts)
+        for keyword, value in keywords.items():
+            if keyword in found:
+                return value
     
     def generate_outfit_from_message(self, message):
         """
@@ -242,74 +421,30 @@ class OutfitGenerator:
         Returns:
             dict: Generated outfit data including name, items, and metadata
         """
-        message = message.lower()
+        # Extract style, occasion, and season from the message
+        style, occasion, season = self.parse_message(message)
         
-        # Extract style from message
-        style = None
-        style_keywords = {
-            "casual": "Casual",
-            "formal": "Formal",
-            "business": "Business",
-            "professional": "Business",
-            "bohemian": "Bohemian",
-            "boho": "Bohemian",
-            "minimalist": "Minimalist",
-            "vintage": "Vintage",
-            "retro": "Vintage",
-            "sporty": "Sporty",
-            "athletic": "Sporty"
-        }
-        
-        for keyword, style_name in style_keywords.items():
-            if keyword in message:
-                style = style_name
-                break
-        
-        # Extract occasion from message
-        occasion = None
-        occasion_keywords = {
-            "work": "Work",
-            "office": "Work",
-            "date": "Date Night",
-            "party": "Party",
-            "weekend": "Weekend",
-            "casual": "Casual Outing",
-            "vacation": "Vacation",
-            "travel": "Travel",
-            "interview": "Interview",
-            "meeting": "Meeting",
-            "special": "Special Occasion",
-            "wedding": "Wedding",
-            "dinner": "Dinner"
-        }
+        # Generate the outfit
+        return self.generate_outfit(style, occasion, season)
+    
+    def parse_message(self, message):
+        """
+        Extract the style, occasion, and season requested in a natural language message.
         
-        for keyword, occasion_name in occasion_keywords.items():
-            if keyword in message:
-                occasion = occasion_name
-                break
-        
-        # Extract season from message
-        season = None
-        season_keywords = {
-            "summer": "Summer",
-            "winter": "Winter",
-            "fall": "Fall",
-            "autumn": "Fall",
-            "spring": "Spring",
-            "hot": "Summer",
-            "cold": "Winter",
-            "warm": "Summer",
-            "cool": "Fall",
-            "rainy": "Spring"
-        }
+        Args:
+            message (str): Natural language message requesting an outfit
+            
+        Returns:
+            tuple: (style, occasion, season), each None if the message does not mention one
+        """
+        message = message.lower()
         
-        for keyword, season_name in season_keywords.items():
-            if keyword in message:
-                season = season_name
-                break
+        found = {match.group(1) for match in self._KEYWORD_RE.finditer(message)}
+        style = self._match_keyword(found, self.STYLE_KEYWORDS)
+        occasion = self._match_keyword(found, self.OCCASION_KEYWORDS)
+        season = self._match_keyword(found, self.SEASON_KEYWORDS)
         
-        # Generate the outfit
-        return self.generate_outfit(style, occasion, season)
+        return style, occasion, season
 
 
 # Example usage
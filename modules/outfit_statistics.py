@@ -5,14 +5,102 @@ This module provides functionality to track and analyze outfit usage statistics.
 """
 
 import datetime
-from db.db_operations import DatabaseManager
+import logging
+from db.db_operations import get_default_manager
+from modules.date_utils import parse_date
+from modules.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+_Q_INSERT_STAT = """
+    INSERT INTO outfit_stats (outfit_id, wear_date, rating, notes)
+    SELECT ?, ?, ?, ?
+    WHERE EXISTS (SELECT 1 FROM outfits WHERE outfit_id = ?)
+    RETURNING stat_id
+"""
+_Q_INSERT_ITEM_STATS = """
+    INSERT INTO item_stats (item_id, wear_date, outfit_id)
+    SELECT item_id, ?, ? FROM outfit_items
+    WHERE outfit_id = ?
+"""
+_Q_OUTFIT_HISTORY = """
+    SELECT * FROM outfit_stats
+    WHERE outfit_id = ?
+    ORDER BY wear_date DESC
+"""
+_Q_ITEM_HISTORY = """
+    SELECT s.*, o.name as outfit_name
+    FROM item_stats s
+    LEFT JOIN outfits o ON s.outfit_id = o.outfit_id
+    WHERE s.item_id = ?
+    ORDER BY s.wear_date DESC
+"""
+# Wears are counted per id before joining, so the join and the top-k sort
+# touch one row per outfit or item rather than one per wear
+_Q_MOST_WORN_OUTFITS = """
+    SELECT s.outfit_id, o.name, s.wear_count, s.avg_rating, s.last_worn
+    FROM (SELECT outfit_id, COUNT(*) as wear_count,
+                 AVG(rating) as avg_rating, MAX(wear_date) as last_worn
+          FROM outfit_stats
+          GROUP BY outfit_id) s
+    JOIN outfits o ON s.outfit_id = o.outfit_id
+    ORDER BY s.wear_count DESC
+    LIMIT ?
+"""
+_Q_MOST_WORN_ITEMS = """
+    SELECT s.item_id, i.name, i.type, i.color, s.wear_count, s.last_worn
+    FROM (SELECT item_id, COUNT(*) as wear_count, MAX(wear_date) as last_worn
+          FROM item_stats
+          GROUP BY item_id) s
+    JOIN clothing_items i ON s.item_id = i.item_id
+    ORDER BY s.wear_count DESC
+    LIMIT ?
+"""
+_Q_LEAST_WORN_ITEMS = """
+    SELECT i.item_id, i.name, i.type, i.color,
+           (SELECT COUNT(*) FROM item_stats s
+            WHERE s.item_id = i.item_id) as wear_count,
+           (SELECT MAX(s.wear_date) FROM item_stats s
+            WHERE s.item_id = i.item_id) as last_worn
+    FROM clothing_items i
+    ORDER BY wear_count ASC, i.name ASC
+    LIMIT ?
+"""
+_Q_HIGHEST_RATED = """
+    SELECT s.outfit_id, o.name, AVG(s.rating) as avg_rating, 
+           COUNT(*) as wear_count, MAX(s.wear_date) as last_worn
+    FROM outfit_stats s
+    JOIN outfits o ON s.outfit_id = o.outfit_id
+    WHERE s.rating IS NOT NULL
+    GROUP BY s.outfit_id
+    ORDER BY avg_rating DESC
+    LIMIT ?
+"""
+_Q_SUMMARY = """
+    SELECT
+        (SELECT COUNT(*) FROM outfits) as total_outfits,
+        (SELECT COUNT(*) FROM clothing_items) as total_items,
+        (SELECT COUNT(*) FROM outfit_stats) as total_wears,
+        (SELECT AVG(rating) FROM outfit_stats WHERE rating IS NOT NULL) as avg_rating,
+        (SELECT MAX(wear_date) FROM outfit_stats) as last_wear,
+        (SELECT COUNT(*)
+         FROM clothing_items i
+         WHERE NOT EXISTS (SELECT 1 FROM item_stats s WHERE s.item_id = i.item_id)) as unworn_items
+"""
 
 class OutfitStatistics:
     """Class to manage outfit usage statistics."""
     
+    # Seconds a cached result is reused; wears recorded through this instance clear it at once.
+    # Limits come from request arguments, so the number of cached results is capped.
+    CACHE_TTL = 30
+    CACHE_MAX_ENTRIES = 64
+    
     def __init__(self, db_manager=None):
         """Initialize the outfit statistics with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
+        # Query results keyed by (kind, ...)
+        self._cache = ResultCache(self.CACHE_TTL, self.CACHE_MAX_ENTRIES)
     
     def record_outfit_wear(self, outfit_id, wear_date=None, rating=None, notes=None):
         """
@@ -33,63 +121,39 @@ class OutfitStatistics:
                 wear_date = datetime.datetime.now().strftime('%Y-%m-%d')
             else:
                 # Validate the date format
-                datetime.datetime.strptime(wear_date, '%Y-%m-%d')
-            
-            # Check if the outfit exists
-            outfit = self.db.get_outfit(outfit_id)
-            if not outfit:
-                print(f"Error: Outfit with ID {outfit_id} does not exist")
-                return None
+                parse_date(wear_date)
             
-            # Insert the stat entry
-            query = """
-                INSERT INTO outfit_stats (outfit_id, wear_date, rating, notes)
-                VALUES (?, ?, ?, ?)
-            """
-            self.db.execute_query(query, (outfit_id, wear_date, rating, notes))
-            
-            # Get the ID of the inserted entry
-            query = "SELECT last_insert_rowid() as stat_id"
-            result = self.db.execute_query(query, fetch_one=True)
-            stat_id = result['stat_id'] if result else None
-            
-            # Record each item in the outfit as worn
-            if stat_id:
+            # Insert the stat entry only if the outfit exists, and get its ID back
+            with self.db.transaction():
+                rows = self.db.raw_execute(_Q_INSERT_STAT, (outfit_id, wear_date, rating, notes, outfit_id))
+                if not rows:
+                    logger.error("Outfit with ID %s does not exist", outfit_id)
+                    return None
+                
+                # Record each item in the outfit as worn
                 self._record_items_wear(outfit_id, wear_date)
             
-            return stat_id
+            self._cache.clear()
+            return rows[0][0]
         except ValueError:
-            print(f"Error: Invalid date format. Please use YYYY-MM-DD")
+            logger.error("Invalid date format. Please use YYYY-MM-DD")
             return None
-        except Exception as e:
-            print(f"Error recording outfit wear: {e}")
+        except Exception:
+            logger.exception("Error recording outfit wear")
             return None
     
     def _record_items_wear(self, outfit_id, wear_date):
         """
         Record that all items in an outfit were worn on a specific date.
         
+        Errors are left to the caller so the outfit's wear is rolled back with them.
+        
         Args:
             outfit_id (int): ID of the outfit
             wear_date (str): Date in YYYY-MM-DD format
         """
-        try:
-            # Get all items in the outfit
-            query = """
-                SELECT item_id FROM outfit_items
-                WHERE outfit_id = ?
-            """
-            items = self.db.execute_query(query, (outfit_id,), fetch_all=True)
-            
-            # Record each item as worn
-            for item in items:
-                query = """
-                    INSERT INTO item_stats (item_id, wear_date, outfit_id)
-                    VALUES (?, ?, ?)
-                """
-                self.db.execute_query(query, (item['item_id'], wear_date, outfit_id))
-        except Exception as e:
-            print(f"Error recording items wear: {e}")
+        # Record every item in the outfit as worn with a single statement
+        self.db.execute_query(_Q_INSERT_ITEM_STATS, (wear_date, outfit_id, outfit_id))
     
     def get_outfit_wear_history(self, outfit_id):
         """
@@ -102,14 +166,9 @@ class OutfitStatistics:
             list: List of wear history entries
         """
         try:
-            query = """
-                SELECT * FROM outfit_stats
-                WHERE outfit_id = ?
-                ORDER BY wear_date DESC
-            """
-            return self.db.execute_query(query, (outfit_id,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting outfit wear history: {e}")
+            return self.db.execute_query(_Q_OUTFIT_HISTORY, (outfit_id,), fetch_all=True)
+        except Exception:
+            logger.exception("Error getting outfit wear history")
             return []
     
     def get_item_wear_history(self, item_id):
@@ -123,16 +182,9 @@ class OutfitStatistics:
             list: List of wear history entries
         """
         try:
-            query = """
-                SELECT s.*, o.name as outfit_name
-                FROM item_stats s
-                LEFT JOIN outfits o ON s.outfit_id = o.outfit_id
-                WHERE s.item_id = ?
-                ORDER BY s.wear_date DESC
-            """
-            return self.db.execute_query(query, (item_id,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting item wear history: {e}")
+            return self.db.execute_query(_Q_ITEM_HISTORY, (item_id,), fetch_all=True)
+        except Exception:
+            logger.exception("Error getting item wear history")
             return []
     
     def get_most_worn_outfits(self, limit=10):
@@ -146,18 +198,15 @@ class OutfitStatistics:
             list: List of outfits with wear count
         """
         try:
-            query = """
-                SELECT s.outfit_id, o.name, COUNT(*) as wear_count, 
-                       AVG(s.rating) as avg_rating, MAX(s.wear_date) as last_worn
-                FROM outfit_stats s
-                JOIN outfits o ON s.outfit_id = o.outfit_id
-                GROUP BY s.outfit_id
-                ORDER BY wear_count DESC
-                LIMIT ?
-            """
-            return self.db.execute_query(query, (limit,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting most worn outfits: {e}")
+            cached = self._cache.get(('most_worn_outfits', limit))
+            if cached:
+                return cached[1]
+            
+            result = self.db.execute_query(_Q_MOST_WORN_OUTFITS, (limit,), fetch_all=True)
+            self._cache.set(('most_worn_outfits', limit), result)
+            return result
+        except Exception:
+            logger.exception("Error getting most worn outfits")
             return []
     
     def get_most_worn_items(self, limit=10):
@@ -171,18 +220,15 @@ class OutfitStatistics:
             list: List of items with wear count
         """
         try:
-            query = """
-                SELECT s.item_id, i.name, i.type, i.color, COUNT(*) as wear_count, 
-                       MAX(s.wear_date) as last_worn
-                FROM item_stats s
-                JOIN clothing_items i ON s.item_id = i.item_id
-                GROUP BY s.item_id
-                ORDER BY wear_count DESC
-                LIMIT ?
-            """
-            return self.db.execute_query(query, (limit,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting most worn items: {e}")
+            cached = self._cache.get(('most_worn_items', limit))
+            if cached:
+                return cached[1]
+            
+            result = self.db.execute_query(_Q_MOST_WORN_ITEMS, (limit,), fetch_all=True)
+            self._cache.set(('most_worn_items', limit), result)
+            return result
+        except Exception:
+            logger.exception("Error getting most worn items")
             return []
     
     def get_least_worn_items(self, limit=10):
@@ -196,19 +242,9 @@ class OutfitStatistics:
             list: List of items with wear count
         """
         try:
-            query = """
-                SELECT i.item_id, i.name, i.type, i.color, 
-                       COUNT(s.stat_id) as wear_count,
-                       MAX(s.wear_date) as last_worn
-                FROM clothing_items i
-                LEFT JOIN item_stats s ON i.item_id = s.item_id
-                GROUP BY i.item_id
-                ORDER BY wear_count ASC, i.name ASC
-                LIMIT ?
-            """
-            return self.db.execute_query(query, (limit,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting least worn items: {e}")
+            return self.db.execute_query(_Q_LEAST_WORN_ITEMS, (limit,), fetch_all=True)
+        except Exception:
+            logger.exception("Error getting least worn items")
             return []
     
     def get_highest_rated_outfits(self, limit=10):
@@ -222,19 +258,15 @@ class OutfitStatistics:
             list: List of outfits with average rating
         """
         try:
-            query = """
-                SELECT s.outfit_id, o.name, AVG(s.rating) as avg_rating, 
-                       COUNT(*) as wear_count, MAX(s.wear_date) as last_worn
-                FROM outfit_stats s
-                JOIN outfits o ON s.outfit_id = o.outfit_id
-                WHERE s.rating IS NOT NULL
-                GROUP BY s.outfit_id
-                ORDER BY avg_rating DESC
-                LIMIT ?
-            """
-            return self.db.execute_query(query, (limit,), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting highest rated outfits: {e}")
+            cached = self._cache.get(('highest_rated_outfits', limit))
+            if cached:
+                return cached[1]
+            
+            result = self.db.execute_query(_Q_HIGHEST_RATED, (limit,), fetch_all=True)
+            self._cache.set(('highest_rated_outfits', limit), result)
+            return result
+        except Exception:
+            logger.exception("Error getting highest rated outfits")
             return []
     
     def get_outfit_statistics_summary(self):
@@ -245,42 +277,16 @@ class OutfitStatistics:
             dict: Summary statistics
         """
         try:
-            # Total number of outfits
-            query = "SELECT COUNT(*) as total_outfits FROM outfits"
-            total_outfits_result = self.db.execute_query(query, fetch_one=True)
-            total_outfits = total_outfits_result['total_outfits'] if total_outfits_result else 0
-            
-            # Total number of items
-            query = "SELECT COUNT(*) as total_items FROM clothing_items"
-            total_items_result = self.db.execute_query(query, fetch_one=True)
-            total_items = total_items_result['total_items'] if total_items_result else 0
-            
-            # Total number of wears
-            query = "SELECT COUNT(*) as total_wears FROM outfit_stats"
-            total_wears_result = self.db.execute_query(query, fetch_one=True)
-            total_wears = total_wears_result['total_wears'] if total_wears_result else 0
+            cached = self._cache.get(('summary',))
+            if cached:
+                return cached[1]
             
-            # Average rating
-            query = "SELECT AVG(rating) as avg_rating FROM outfit_stats WHERE rating IS NOT NULL"
-            avg_rating_result = self.db.execute_query(query, fetch_one=True)
-            avg_rating = avg_rating_result['avg_rating'] if avg_rating_result and avg_rating_result['avg_rating'] else 0
+            # Gather every figure in a single round trip
+            (total_outfits, total_items, total_wears, avg_rating,
+             last_wear, unworn_items) = self.db.raw_execute(_Q_SUMMARY)[0]
+            avg_rating = avg_rating or 0
             
-            # Most recent wear
-            query = "SELECT MAX(wear_date) as last_wear FROM outfit_stats"
-            last_wear_result = self.db.execute_query(query, fetch_one=True)
-            last_wear = last_wear_result['last_wear'] if last_wear_result else None
-            
-            # Number of unworn items
-            query = """
-                SELECT COUNT(*) as unworn_items
-                FROM clothing_items i
-                LEFT JOIN item_stats s ON i.item_id = s.item_id
-                WHERE s.stat_id IS NULL
-            """
-            unworn_items_result = self.db.execute_query(query, fetch_one=True)
-            unworn_items = unworn_items_result['unworn_items'] if unworn_items_result else 0
-            
-            return {
+            summary = {
                 'total_outfits': total_outfits,
                 'total_items': total_items,
                 'total_wears': total_wears,
@@ -289,8 +295,10 @@ class OutfitStatistics:
                 'unworn_items': unworn_items,
                 'unworn_percentage': round(unworn_items / total_items * 100, 1) if total_items > 0 else 0
             }
-        except Exception as e:
-            print(f"Error getting outfit statistics summary: {e}")
+            self._cache.set(('summary',), summary)
+            return summary
+        except Exception:
+            logger.exception("Error getting outfit statistics summary")
             return {
                 'total_outfits': 0,
                 'total_items': 0,
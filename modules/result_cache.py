@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Result cache for the Clothing Database System.
+This module provides a small thread-safe cache for query results that expire after a time limit.
+"""
+
+import threading
+import time
+
+class ResultCache:
+    """Thread-safe cache of query results with a time limit and a size cap."""
+    
+    def __init__(self, ttl, max_entries):
+        """
+        Initialize an empty result cache.
+        
+        Args:
+            ttl (float): Seconds a cached result is reused
+            max_entries (int): Maximum number of results kept; the oldest is dropped first
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Results keyed by (kind, ...), stored as (timestamp, result) in insertion order
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        Get a cached result if it has not expired.
+        
+        Args:
+            key (tuple): Cache key
+            
+        Returns:
+            tuple: (timestamp, result) if a fresh entry exists, None otherwise
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached
+        return None
+    
+    def set(self, key, result):
+        """
+        Cache a result, dropping the oldest entry if the cache is full.
+        
+        Args:
+            key (tuple): Cache key
+            result: Result to cache
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic(), result)
+    
+    def clear(self):
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
@@ -4,8 +4,14 @@ Seasonal Wardrobe Transition Helper for the Clothing Database System.
 This module provides functionality to manage seasonal wardrobe transitions.
 """
 
+import bisect
 import datetime
-from db.db_operations import DatabaseManager
+import functools
+import logging
+import threading
+from db.db_operations import get_default_manager
+
+logger = logging.getLogger(__name__)
 
 class SeasonalTransitionHelper:
     """Class to manage seasonal wardrobe transitions."""
@@ -18,9 +24,25 @@ class SeasonalTransitionHelper:
         'Winter': {'start_month': 12, 'start_day': 21, 'end_month': 3, 'end_day': 19}
     }
     
+    # Season start days encoded as month * 100 + day, in calendar order
+    _SEASON_STARTS = tuple(sorted((dates['start_month'] * 100 + dates['start_day'], season)
+                                  for season, dates in SEASONS.items()))
+    _SEASON_START_KEYS = tuple(key for key, _ in _SEASON_STARTS)
+    
+    # (season, start MM-DD, end MM-DD) of the transitions setup_seasonal_transitions writes
+    _DEFAULT_TRANSITIONS = tuple((season, f"{dates['start_month']:02d}-{dates['start_day']:02d}",
+                                  f"{dates['end_month']:02d}-{dates['end_day']:02d}")
+                                 for season, dates in SEASONS.items())
+    
+    # Years whose transitions have been set up in the background by this process
+    _backfilled_years = set()
+    _backfill_lock = threading.Lock()
+    
     def __init__(self, db_manager=None):
         """Initialize the seasonal transition helper with a database manager."""
-        self.db = db_manager if db_manager else DatabaseManager()
+        self.db = db_manager if db_manager else get_default_manager()
+        # Whether any stored transition differs from SEASONS, checked on first use
+        self._has_custom_seasons = None
     
     def setup_seasonal_transitions(self, year=None):
         """
@@ -36,10 +58,8 @@ class SeasonalTransitionHelper:
             if year is None:
                 year = datetime.datetime.now().year
             
-            # Clear existing transitions for this year
-            self._clear_transitions_for_year(year)
-            
-            # Set up transitions for each season
+            # Build the transition rows for each season
+            rows = []
             for season, dates in self.SEASONS.items():
                 start_month = dates['start_month']
                 start_day = dates['start_day']
@@ -54,16 +74,20 @@ class SeasonalTransitionHelper:
                     start_date = f"{year}-{start_month:02d}-{start_day:02d}"
                     end_date = f"{year}-{end_month:02d}-{end_day:02d}"
                 
-                # Insert the transition
-                query = """
-                    INSERT INTO seasonal_transitions (season, start_date, end_date, notification_sent)
-                    VALUES (?, ?, ?, 0)
-                """
-                self.db.execute_query(query, (season, start_date, end_date))
+                rows.append((season, start_date, end_date))
+            
+            # Replace the year's transitions in a single transaction
+            query = """
+                INSERT INTO seasonal_transitions (season, start_date, end_date, notification_sent)
+                VALUES (?, ?, ?, 0)
+            """
+            with self.db.transaction():
+                self._clear_transitions_for_year(year)
+                self.db.execute_many(query, rows)
             
             return True
-        except Exception as e:
-            print(f"Error setting up seasonal transitions: {e}")
+        except Exception:
+            logger.exception("Error setting up seasonal transitions")
             return False
     
     def _clear_transitions_for_year(self, year):
@@ -75,60 +99,110 @@ class SeasonalTransitionHelper:
         """
         try:
             # Delete transitions that start in the specified year
-            query = "DELETE FROM seasonal_transitions WHERE start_date LIKE ?"
-            self.db.execute_query(query, (f"{year}-%",))
-        except Exception as e:
-            print(f"Error clearing transitions for year {year}: {e}")
+            query = "DELETE FROM seasonal_transitions WHERE start_date >= ? AND start_date < ?"
+            self.db.execute_query(query, (f"{year}-01-01", f"{year + 1}-01-01"))
+        except Exception:
+            logger.exception("Error clearing transitions for year %s", year)
     
-    def get_current_season(self):
+    def get_current_season(self, today=None):
         """
         Get the current season based on the date.
         
+        Args:
+            today (datetime.date, optional): Date to use as today. Defaults to the current date.
+            
         Returns:
             str: Current season name
         """
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        if today is None:
+            today = datetime.date.today()
+        
+        # Stored transitions only matter if someone has changed their dates
+        if not self._uses_custom_seasons():
+            return self._calculate_current_season(today)
         
         try:
             query = """
                 SELECT season FROM seasonal_transitions
                 WHERE ? BETWEEN start_date AND end_date
             """
-            result = self.db.execute_query(query, (today,), fetch_one=True)
+            result = self.db.execute_query(query, (today.isoformat(),), fetch_one=True)
             
-            return result['season'] if result else self._calculate_current_season()
-        except Exception as e:
-            print(f"Error getting current season: {e}")
-            return self._calculate_current_season()
+            return result['season'] if result else self._calculate_current_season(today)
+        except Exception:
+            logger.exception("Error getting current season")
+            return self._calculate_current_season(today)
     
-    def _calculate_current_season(self):
+    def _uses_custom_seasons(self):
+        """
+        Check if any stored transition has dates other than the defaults in SEASONS.
+        
+        The answer is looked up once and reused for the life of this helper.
+        
+        Returns:
+            bool: True if the stored transitions must be consulted
+        """
+        if self._has_custom_seasons is None:
+            try:
+                defaults = ', '.join('(?, ?, ?)' for _ in self._DEFAULT_TRANSITIONS)
+                query = f"""
+                    SELECT EXISTS (
+                        SELECT 1 FROM seasonal_transitions
+                        WHERE (season, substr(start_date, 6), substr(end_date, 6))
+                              NOT IN (VALUES {defaults})
+                    )
+                """
+                params = [value for row in self._DEFAULT_TRANSITIONS for value in row]
+                self._has_custom_seasons = bool(self.db.raw_execute(query, params)[0][0])
+            except Exception:
+                logger.exception("Error checking for custom seasons")
+                return True
+        return self._has_custom_seasons
+    
+    def _calculate_current_season(self, today=None):
         """
         Calculate the current season based on the date.
         
+        Args:
+            today (datetime.date, optional): Date to use as today. Defaults to the current date.
+            
         Returns:
             str: Current season name
         """
-        now = datetime.datetime.now()
-        month = now.month
-        day = now.day
+        if today is None:
+            today = datetime.date.today()
+        return self._season_for_day(today.month, today.day)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=366)
+    def _season_for_day(cls, month, day):
+        """
+        Get the season a day of the year falls in.
         
-        if (month == 3 and day >= 20) or (month > 3 and month < 6) or (month == 6 and day <= 20):
-            return 'Spring'
-        elif (month == 6 and day >= 21) or (month > 6 and month < 9) or (month == 9 and day <= 22):
-            return 'Summer'
-        elif (month == 9 and day >= 23) or (month > 9 and month < 12) or (month == 12 and day <= 20):
-            return 'Fall'
-        else:
-            return 'Winter'
+        Args:
+            month (int): Month number
+            day (int): Day of the month
+            
+        Returns:
+            str: Season name
+        """
+        # Days before the first start in the year belong to the last season (Winter)
+        index = bisect.bisect_right(cls._SEASON_START_KEYS, month * 100 + day) - 1
+        return cls._SEASON_STARTS[index][1]
     
-    def get_upcoming_season(self):
+    def get_upcoming_season(self, today=None):
         """
         Get the upcoming season based on the current date.
         
+        Args:
+            today (datetime.date, optional): Date to use as today. Defaults to the current date.
+            
         Returns:
             dict: Upcoming season data with name and start date
         """
-        current_season = self.get_current_season()
+        if today is None:
+            today = datetime.date.today()
+        current_season = self.get_current_season(today)
         
         # Define the next season
         next_seasons = {
@@ -142,58 +216,61 @@ class SeasonalTransitionHelper:
         
         try:
             # Get the start date of the upcoming season
-            today = datetime.datetime.now().strftime('%Y-%m-%d')
-            
             query = """
                 SELECT season, start_date FROM seasonal_transitions
                 WHERE season = ? AND start_date > ?
                 ORDER BY start_date ASC
                 LIMIT 1
             """
-            result = self.db.execute_query(query, (upcoming_season, today), fetch_one=True)
+            result = self.db.execute_query(query, (upcoming_season, today.isoformat()), fetch_one=True)
             
             if result:
                 return {
                     'season': result['season'],
                     'start_date': result['start_date']
                 }
-            else:
-                # If not found, it might be in the next year
-                next_year = datetime.datetime.now().year + 1
-                self.setup_seasonal_transitions(next_year)
-                
-                # Try again
-                result = self.db.execute_query(query, (upcoming_season, today), fetch_one=True)
-                
-                if result:
-                    return {
-                        'season': result['season'],
-                        'start_date': result['start_date']
-                    }
-                else:
-                    # Fallback to calculated dates
-                    return {
-                        'season': upcoming_season,
-                        'start_date': self._calculate_season_start_date(upcoming_season)
-                    }
-        except Exception as e:
-            print(f"Error getting upcoming season: {e}")
+            
+            # The transitions for that year are not set up yet. Use the
+            # calculated date and set the year up without making the caller wait.
+            start_date = self._calculate_season_start_date(upcoming_season, today)
+            self._backfill_transitions(int(start_date[:4]))
             return {
                 'season': upcoming_season,
-                'start_date': self._calculate_season_start_date(upcoming_season)
+                'start_date': start_date
+            }
+        except Exception:
+            logger.exception("Error getting upcoming season")
+            return {
+                'season': upcoming_season,
+                'start_date': self._calculate_season_start_date(upcoming_season, today)
             }
     
-    def _calculate_season_start_date(self, season):
+    def _backfill_transitions(self, year):
+        """
+        Set up the transitions for a year in a background thread, at most once per process.
+        
+        Args:
+            year (int): Year to set up transitions for
+        """
+        with self._backfill_lock:
+            if year in self._backfilled_years:
+                return
+            self._backfilled_years.add(year)
+        
+        threading.Thread(target=self.setup_seasonal_transitions, args=(year,), daemon=True).start()
+    
+    def _calculate_season_start_date(self, season, today=None):
         """
         Calculate the start date of a season.
         
         Args:
             season (str): Season name
+            today (datetime.date, optional): Date to use as today. Defaults to the current date.
             
         Returns:
             str: Start date in YYYY-MM-DD format
         """
-        now = datetime.datetime.now()
+        now = today if today is not None else datetime.date.today()
         year = now.year
         
         # If we're calculating for next year's season
@@ -206,8 +283,23 @@ class SeasonalTransitionHelper:
         elif season == 'Winter' and now.month > 12:
             year += 1
         
-        month = self.SEASONS[season]['start_month']
-        day = self.SEASONS[season]['start_day']
+        return self._season_start_date(season, year)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=32)
+    def _season_start_date(cls, season, year):
+        """
+        Get the start date of a season in a given year.
+        
+        Args:
+            season (str): Season name
+            year (int): Year the season starts in
+            
+        Returns:
+            str: Start date in YYYY-MM-DD format
+        """
+        month = cls.SEASONS[season]['start_month']
+        day = cls.SEASONS[season]['start_day']
         
         return f"{year}-{month:02d}-{day:02d}"
     
@@ -223,70 +315,99 @@ class SeasonalTransitionHelper:
         """
         try:
             query = """
-                SELECT * FROM clothing_items
-                WHERE season LIKE ?
+                SELECT i.* FROM item_seasons s
+                JOIN clothing_items i ON i.item_id = s.item_id
+                WHERE s.season = ?
             """
-            return self.db.execute_query(query, (f"%{season}%",), fetch_all=True)
-        except Exception as e:
-            print(f"Error getting seasonal items: {e}")
+            return self.db.execute_query(query, (season,), fetch_all=True)
+        except Exception:
+            logger.exception("Error getting seasonal items")
             return []
     
-    def get_transition_recommendations(self):
+    def _get_seasonal_item_ids(self, season):
+        """
+        Get the IDs of all clothing items for a specific season.
+        
+        Args:
+            season (str): Season name
+            
+        Returns:
+            set: IDs of the clothing items for the season
+        """
+        try:
+            query = "SELECT item_id FROM item_seasons WHERE season = ?"
+            return {item_id for (item_id,) in self.db.iter_rows(query, (season,))}
+        except Exception:
+            logger.exception("Error getting seasonal items")
+            return set()
+    
+    def get_transition_recommendations(self, today=None):
         """
         Get recommendations for seasonal wardrobe transition.
         
+        Args:
+            today (datetime.date, optional): Date to use as today. Defaults to the current date.
+            
         Returns:
             dict: Transition recommendations
         """
-        current_season = self.get_current_season()
-        upcoming_season = self.get_upcoming_season()
+        # Read the clock once so every part of the recommendation agrees on the date
+        if today is None:
+            today = datetime.date.today()
+        current_season = self.get_current_season(today)
+        upcoming_season = self.get_upcoming_season(today)
         
-        # Get items for current and upcoming seasons
-        current_items = self.get_seasonal_items(current_season)
-        upcoming_items = self.get_seasonal_items(upcoming_season['season'])
-        
-        # Get all-season items
-        all_season_items = self.get_seasonal_items('All-Season')
+        # Work out which items go where from their IDs, then load them all at once
+        current_ids = self._get_seasonal_item_ids(current_season)
+        upcoming_ids = self._get_seasonal_item_ids(upcoming_season['season'])
+        all_season_ids = self._get_seasonal_item_ids('All-Season')
         
         # Items to store (current season items that are not in upcoming season)
-        items_to_store = []
-        for item in current_items:
-            if item not in upcoming_items and item not in all_season_items:
-                items_to_store.append(item)
+        to_store_ids = current_ids - upcoming_ids - all_season_ids
         
         # Items to bring out (upcoming season items that are not in current season)
+        to_bring_out_ids = upcoming_ids - current_ids - all_season_ids
+        
+        items_to_store = []
         items_to_bring_out = []
-        for item in upcoming_items:
-            if item not in current_items and item not in all_season_items:
+        all_season_items = []
+        for item in self.db.get_clothing_items_by_ids(to_store_ids | to_bring_out_ids | all_season_ids):
+            if item['item_id'] in all_season_ids:
+                all_season_items.append(item)
+            if item['item_id'] in to_store_ids:
+                items_to_store.append(item)
+            elif item['item_id'] in to_bring_out_ids:
                 items_to_bring_out.append(item)
         
         return {
             'current_season': current_season,
             'upcoming_season': upcoming_season['season'],
             'transition_date': upcoming_season['start_date'],
-            'days_until_transition': self._days_until_date(upcoming_season['start_date']),
+            'days_until_transition': self._days_until_date(upcoming_season['start_date'], today),
             'items_to_store': items_to_store,
             'items_to_bring_out': items_to_bring_out,
             'all_season_items': all_season_items
         }
     
-    def _days_until_date(self, date_str):
+    def _days_until_date(self, date_str, today=None):
         """
         Calculate the number of days until a specific date.
         
         Args:
             date_str (str): Date in YYYY-MM-DD format
+            today (datetime.date, optional): Date to count from. Defaults to the current date.
             
         Returns:
             int: Number of days until the date
         """
         try:
             target_date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-            today = datetime.datetime.now().date()
+            if today is None:
+                today = datetime.date.today()
             delta = target_date - today
             return max(0, delta.days)
-        except Exception as e:
-            print(f"Error calculating days until date: {e}")
+        except Exception:
+            logger.exception("Error calculating days until date")
             return 0
     
     def check_transition_notification(self):
@@ -297,7 +418,7 @@ class SeasonalTransitionHelper:
             dict: Notification data if a notification should be sent, None otherwise
         """
         try:
-            today = datetime.datetime.now().date()
+            today = datetime.date.today()
             
             # Get upcoming transitions
             query = """
@@ -306,7 +427,7 @@ class SeasonalTransitionHelper:
                 ORDER BY start_date ASC
                 LIMIT 1
             """
-            transition = self.db.execute_query(query, (today.strftime('%Y-%m-%d'),), fetch_one=True)
+            transition = self.db.execute_query(query, (today.isoformat(),), fetch_one=True)
             
             if not transition:
                 return None
@@ -326,7 +447,7 @@ class SeasonalTransitionHelper:
                 self.db.execute_query(update_query, (transition['transition_id'],))
                 
                 # Get transition recommendations
-                recommendations = self.get_transition_recommendations()
+                recommendations = self.get_transition_recommendations(today)
                 
                 return {
                     'season': transition['season'],
@@ -336,8 +457,8 @@ class SeasonalTransitionHelper:
                 }
             
             return None
-        except Exception as e:
-            print(f"Error checking transition notification: {e}")
+        except Exception:
+            logger.exception("Error checking transition notification")
             return None
 
 
@@ -4,18 +4,111 @@ Chatbot module for the Clothing Database System.
 This module provides the chatbot functionality for interactive outfit suggestions.
 """
 
+import asyncio
+import copy
+import functools
 import re
 import random
+from collections import deque
+from itertools import islice
 from modules.outfit_generator import OutfitGenerator
+from modules.result_cache import ResultCache
+
+# Phrases that trigger each special command, in priority order
+_INTENT_PHRASES = {
+    'greeting': ('hello', 'hi', 'hey', 'greetings', 'howdy', 'hola'),
+    'help': ('help', 'how does this work', 'what can you do', 'instructions', 'guide me'),
+    'positive_feedback': ('like it', 'love it', 'perfect', 'good job'),
+    'negative_feedback': ('don\'t like', 'hate it', 'not what i want', 'try again')
+}
+
+_GREETING_RESPONSES = (
+    "Hello! I'm your Outfit Assistant. How can I help you today?",
+    "Hi there! Ready to find the perfect outfit?",
+    "Hey! I can suggest outfits based on your clothing items. What are you looking for?",
+    "Greetings! Tell me what kind of outfit you need, and I'll help you create it."
+)
+# Requests picked from when the user asks for a new random outfit
+_RANDOM_PROMPTS = (
+    "I need a casual outfit",
+    "Suggest a formal outfit",
+    "What should I wear for work?",
+    "I need something for the weekend",
+    "Suggest a summer outfit",
+    "What would look good for winter?",
+    "I need a business casual look",
+    "Suggest something for a date night"
+)
+
+_HELP_TEXT = """
+I'm your Outfit Assistant! Here's how I can help you:
+
+1. Ask me to suggest an outfit, like:
+   - "Suggest a casual outfit for summer"
+   - "What should I wear to work tomorrow?"
+   - "I need something formal for a dinner"
+
+2. You can specify:
+   - Style (casual, formal, business, bohemian, etc.)
+   - Occasion (work, date, weekend, party, etc.)
+   - Season (summer, winter, fall, spring)
+
+3. After I suggest an outfit, you can:
+   - Save it to your database
+   - Ask for a different suggestion
+   - Refine your request with more details
+
+What kind of outfit would you like me to suggest?
+"""
+
+def _intent_pattern(intent_phrases):
+    """
+    Compile a regex matching any phrase from an intent table as whole words in a single scan.
+    
+    Args:
+        intent_phrases (dict): Intent names mapped to their trigger phrases
+        
+    Returns:
+        re.Pattern: Pattern for lowercase text with one named group per intent
+    """
+    # Word boundaries keep "hi" out of "this" and "help" out of "helpful"
+    alternatives = []
+    for intent, phrases in intent_phrases.items():
+        pattern = "|".join(map(re.escape, phrases))
+        alternatives.append(rf"(?P<{intent}>\b(?:{pattern})\b)")
+    return re.compile("|".join(alternatives))
 
 class OutfitChatbot:
     """Class to handle chatbot interactions for outfit suggestions."""
     
-    def __init__(self, db_manager=None):
-        """Initialize the chatbot with a database manager."""
+    # Every special command in one pattern; each match is tagged by its group name
+    _INTENT_RE = _intent_pattern(_INTENT_PHRASES)
+    
+    # Oldest conversation entries are dropped once this many are kept
+    MAX_HISTORY = 1000
+    
+    # Number of suggestions kept when outfit caching is enabled, and seconds each is
+    # reused; items can be deleted elsewhere, so suggestions must not outlive them for long
+    OUTFIT_CACHE_SIZE = 128
+    OUTFIT_CACHE_TTL = 60
+    
+    def __init__(self, db_manager=None, cache_outfits=False):
+        """
+        Initialize the chatbot with a database manager.
+        
+        Args:
+            db_manager (DatabaseManager, optional): Database manager to use
+            cache_outfits (bool, optional): Reuse the outfit suggested for an earlier
+                message asking for the same style, occasion, and season
+        """
         self.outfit_generator = OutfitGenerator(db_manager)
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=self.MAX_HISTORY)
         self.current_outfit = None
+        self.cache_outfits = cache_outfits
+        # Own generator so concurrent chatbots do not share the module-level random state
+        self._rng = random.Random()
+        # Successful suggestions keyed by (style, occasion, season)
+        self._outfit_cache = ResultCache(self.OUTFIT_CACHE_TTL, self.OUTFIT_CACHE_SIZE)
     
     def process_message(self, message):
         """
@@ -27,28 +120,125 @@ class OutfitChatbot:
         Returns:
             dict: Response containing message text and any generated outfit
         """
+        reply, generate = self._begin_turn(message)
+        return generate() if generate else reply
+    
+    async def process_message_async(self, message):
+        """
+        Process a user message without blocking the event loop.
+        
+        Commands are answered directly; outfit generation, which queries the
+        database, runs in a worker thread. Turns for one chatbot should be
+        awaited one at a time so the conversation history stays in order.
+        
+        Args:
+            message (str): User message
+            
+        Returns:
+            dict: Response containing message text and any generated outfit
+        """
+        reply, generate = self._begin_turn(message)
+        return await asyncio.to_thread(generate) if generate else reply
+    
+    def _begin_turn(self, message):
+        """
+        Record a user message and answer it at once if it is a command.
+        
+        Args:
+            message (str): User message
+            
+        Returns:
+            tuple: (reply, None) for a command, or (None, generate) where generate
+                is a blocking callable that generates, records, and returns the reply
+        """
         # Add user message to conversation history
         self.conversation_history.append({"role": "user", "content": message})
         
-        # Check for special commands
-        if self._is_greeting(message):
-            return self._handle_greeting()
+        # Lowercase once for every check below
+        msg_lc = message.lower()
         
-        if self._is_help_request(message):
-            return self._handle_help_request()
+        # Check for special commands, in priority order
+        intents = self._detect_intents(msg_lc)
+        reply = self._handle_command(intents)
         
-        if self._is_feedback(message):
-            return self._handle_feedback(message)
+        if reply is not None:
+            self._record_reply(reply)
+            return reply, None
+        
+        if 'negative_feedback' in intents:
+            # Try again; generate_new_outfit records its own exchange
+            return None, self.generate_new_outfit
         
         # Default behavior: generate outfit suggestion
-        result = self.outfit_generator.generate_outfit_from_message(message)
+        return None, functools.partial(self._reply_with_outfit, msg_lc)
+    
+    def _reply_with_outfit(self, message):
+        """
+        Suggest an outfit for a message and record it as the reply.
+        
+        Args:
+            message (str): Lowercased user message
+            
+        Returns:
+            dict: Generated outfit data
+        """
+        result = self._suggest_outfit(message)
         
         # Store the current outfit if successful
         if result['success']:
             self.current_outfit = result['outfit']
         
-        # Add assistant response to conversation history
+        self._record_reply(result)
+        return result
+    
+    def _record_reply(self, result):
+        """Add an assistant response to the conversation history."""
         self.conversation_history.append({"role": "assistant", "content": result['message']})
+    
+    def _handle_command(self, intents):
+        """
+        Answer a greeting, help request, or positive feedback.
+        
+        Args:
+            intents (set): Intent names found in the message
+            
+        Returns:
+            dict: Response for the highest priority command, or None if the
+                message needs an outfit generated
+        """
+        if 'greeting' in intents:
+            return self._handle_greeting()
+        if 'help' in intents:
+            return self._handle_help_request()
+        if 'positive_feedback' in intents:
+            return self._handle_feedback()
+        return None
+    
+    def _suggest_outfit(self, message):
+        """
+        Generate an outfit for a message, reusing a cached suggestion if enabled.
+        
+        Args:
+            message (str): User message
+            
+        Returns:
+            dict: Generated outfit data
+        """
+        if not self.cache_outfits:
+            return self.outfit_generator.generate_outfit_from_message(message)
+        
+        # Messages asking for the same style, occasion, and season share a suggestion
+        key = self.outfit_generator.parse_message(message)
+        cached = self._outfit_cache.get(key)
+        # Copies keep edits to one reply's outfit out of the cache and other replies
+        if cached:
+            return copy.deepcopy(cached[1])
+        
+        result = self.outfit_generator.generate_outfit(*key)
+        
+        # Failures are not cached so newly added items are picked up
+        if result['success']:
+            self._outfit_cache.set(key, copy.deepcopy(result))
         
         return result
     
@@ -79,20 +269,18 @@ class OutfitChatbot:
             dict: Generated outfit data
         """
         # Generate a random prompt
-        prompts = [
-            "I need a casual outfit",
-            "Suggest a formal outfit",
-            "What should I wear for work?",
-            "I need something for the weekend",
-            "Suggest a summer outfit",
-            "What would look good for winter?",
-            "I need a business casual look",
-            "Suggest something for a date night"
-        ]
-        random_prompt = random.choice(prompts)
-        
-        # Process the random prompt
-        result = self.process_message(random_prompt)
+        random_prompt = self._rng.choice(_RANDOM_PROMPTS)
+        
+        self.conversation_history.append({"role": "user", "content": random_prompt})
+        
+        # The prompts are known outfit requests, so skip command detection and
+        # the outfit cache, which would hand back the same outfit every time
+        result = self.outfit_generator.generate_outfit_from_message(random_prompt)
+        
+        if result['success']:
+            self.current_outfit = result['outfit']
+        
+        self._record_reply(result)
         
         # Add context to the response
         if result['success']:
@@ -110,92 +298,40 @@ class OutfitChatbot:
         Returns:
             list: Recent conversation history
         """
-        return self.conversation_history[-max_entries:] if self.conversation_history else []
+        history = self.conversation_history
+        return list(islice(history, max(0, len(history) - max_entries), None))
     
-    def _is_greeting(self, message):
-        """Check if the message is a greeting."""
-        greetings = ['hello', 'hi', 'hey', 'greetings', 'howdy', 'hola']
-        message = message.lower()
+    def _detect_intents(self, message):
+        """
+        Find the special commands a message contains in a single scan.
         
-        return any(greeting in message.split() for greeting in greetings)
+        Args:
+            message (str): Lowercased user message
+            
+        Returns:
+            set: Intent names found ('greeting', 'help', 'positive_feedback', 'negative_feedback')
+        """
+        return {match.lastgroup for match in self._INTENT_RE.finditer(message)}
     
     def _handle_greeting(self):
         """Handle a greeting message."""
-        greetings = [
-            "Hello! I'm your Outfit Assistant. How can I help you today?",
-            "Hi there! Ready to find the perfect outfit?",
-            "Hey! I can suggest outfits based on your clothing items. What are you looking for?",
-            "Greetings! Tell me what kind of outfit you need, and I'll help you create it."
-        ]
-        
-        response = random.choice(greetings)
-        
-        # Add assistant response to conversation history
-        self.conversation_history.append({"role": "assistant", "content": response})
+        response = self._rng.choice(_GREETING_RESPONSES)
         
         return {
             'success': True,
             'message': response
         }
     
-    def _is_help_request(self, message):
-        """Check if the message is a help request."""
-        help_phrases = ['help', 'how does this work', 'what can you do', 'instructions', 'guide me']
-        message = message.lower()
-        
-        return any(phrase in message for phrase in help_phrases)
-    
     def _handle_help_request(self):
         """Handle a help request message."""
-        help_text = """
-I'm your Outfit Assistant! Here's how I can help you:
-
-1. Ask me to suggest an outfit, like:
-   - "Suggest a casual outfit for summer"
-   - "What should I wear to work tomorrow?"
-   - "I need something formal for a dinner"
-
-2. You can specify:
-   - Style (casual, formal, business, bohemian, etc.)
-   - Occasion (work, date, weekend, party, etc.)
-   - Season (summer, winter, fall, spring)
-
-3. After I suggest an outfit, you can:
-   - Save it to your database
-   - Ask for a different suggestion
-   - Refine your request with more details
-
-What kind of outfit would you like me to suggest?
-"""
-        
-        # Add assistant response to conversation history
-        self.conversation_history.append({"role": "assistant", "content": help_text})
-        
         return {
             'success': True,
-            'message': help_text
+            'message': _HELP_TEXT
         }
     
-    def _is_feedback(self, message):
-        """Check if the message contains feedback about an outfit."""
-        feedback_phrases = ['like it', 'don\'t like', 'love it', 'hate it', 'not what i want', 'perfect', 'good job', 'try again']
-        message = message.lower()
-        
-        return any(phrase in message for phrase in feedback_phrases)
-    
-    def _handle_feedback(self, message):
-        """Handle feedback about an outfit."""
-        message = message.lower()
-        
-        if any(phrase in message for phrase in ['like it', 'love it', 'perfect', 'good job']):
-            response = "I'm glad you like the outfit! Would you like to save it to your database?"
-        else:
-            response = "I'm sorry the outfit didn't meet your expectations. Let me try again with a different suggestion."
-            # Generate a new outfit
-            return self.generate_new_outfit()
-        
-        # Add assistant response to conversation history
-        self.conversation_history.append({"role": "assistant", "content": response})
+    def _handle_feedback(self):
+        """Handle positive feedback about an outfit."""
+        response = "I'm glad you like the outfit! Would you like to save it to your database?"
         
         return {
             'success': True,
@@ -12,7 +12,17 @@ mount -t cifs "$CIFS_SHARE" "$MOUNT_POINT" -o guest,uid=$(id -u),gid=$(id -g),ve
 
 # Ensure mount succeeded
 if mountpoint -q "$MOUNT_POINT"; then
-    cp "$SOURCE_DB" "$MOUNT_POINT/$BACKUP_NAME"
+    # The app uses WAL mode; the online backup includes commits still in the WAL.
+    # Python's sqlite3 module is used so the sqlite3 command-line shell isn't needed;
+    # the source is opened read-only so a missing database isn't created empty
+    if ! python3 -c 'import sqlite3, sys; sqlite3.connect("file:" + sys.argv[1] + "?mode=ro", uri=True).backup(sqlite3.connect(sys.argv[2]))' \
+            "$SOURCE_DB" "$MOUNT_POINT/$BACKUP_NAME"; then
+        echo "Backup failed: Could not back up $SOURCE_DB" >> /var/log/outfit_backup.log
+        # Don't let a partial copy count towards the backups kept below
+        rm -f "$MOUNT_POINT/$BACKUP_NAME"
+        umount "$MOUNT_POINT"
+        exit 1
+    fi
 
     # Optional: keep only 4 most recent backups
     ls -1t "$MOUNT_POINT"/outfit_*.db | tail -n +5 | xargs -r rm --